@@ -14,7 +14,24 @@ def create_app():
         DATABASE=os.path.join(app.instance_path, 'votes.db'),
         CURRENT_CONTEST_YEAR=int(os.getenv("CURRENT_CONTEST_YEAR", "2026")),
         LEGACY_CONTEST_YEARS=[2025],
-        VOTING_END_AT=os.getenv("VOTING_END_AT", "2026-12-31T23:59:59")
+        VOTING_END_AT=os.getenv("VOTING_END_AT", "2026-12-31T23:59:59"),
+        # 0 => Migrationen nur per `flask db-upgrade` (einmal pro Deploy statt pro Worker)
+        DB_AUTO_MIGRATE=os.getenv("DB_AUTO_MIGRATE", "1") != "0",
+        # Connection-Pool (pro Prozess) + SQLite-Tuning
+        DB_WRITER_POOL_SIZE=int(os.getenv("DB_WRITER_POOL_SIZE", "4")),
+        DB_READER_POOL_SIZE=int(os.getenv("DB_READER_POOL_SIZE", "8")),
+        DB_BUSY_TIMEOUT_MS=int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+        DB_MMAP_SIZE=int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+        DB_CACHE_SIZE=int(os.getenv("DB_CACHE_SIZE", "-16000")),
+        # Prozess-Pool für WebP/AVIF-Ableitungen (Upload + `flask build-derivatives`)
+        DERIVATIVE_WORKERS=int(os.getenv("DERIVATIVE_WORKERS", "2")),
+        # Opt-in Write-Behind: vote/react/duel_vote per Gruppen-Commit (ein Writer-Thread pro Prozess)
+        WRITE_QUEUE_ENABLED=os.getenv("WRITE_QUEUE_ENABLED", "0") == "1",
+        WRITE_QUEUE_MAX_BATCH=int(os.getenv("WRITE_QUEUE_MAX_BATCH", "256")),
+        WRITE_QUEUE_MAX_DELAY_MS=float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", "2")),
+        WRITE_QUEUE_TIMEOUT=float(os.getenv("WRITE_QUEUE_TIMEOUT", "10")),
+        # Ordner-Index (Sticker/Uploads): so oft höchstens per stat auf Änderungen prüfen
+        FILE_INDEX_POLL_SECONDS=float(os.getenv("FILE_INDEX_POLL_SECONDS", "2"))
     )
 
     load_dotenv()
@@ -25,18 +42,13 @@ def create_app():
     for y in app.config.get('LEGACY_CONTEST_YEARS', []):
         os.makedirs(os.path.join(app.root_path, f"static/uploads_{y}"), exist_ok=True)
 
-    # DB initialisieren + Migrationen sicher ausführen
+    # DB initialisieren + ausstehende Migrationen (warmer Start liest nur user_version)
     from . import db
     db.init_app(app)
-    with app.app_context():
-        db.init_db()
-        db.migrate_uploads_to_year_dirs(default_legacy_year=2025)
-        db.migrate_null_years(default_legacy_year=2025)
-        conn = db.get_db()
-        conn.execute(
-            "UPDATE images SET visible = 1 WHERE contest_year = 2025"
-        )
-        conn.commit()
+    # Nicht während `flask db-upgrade` (der Befehl migriert/prüft selbst, --check bleibt read-only)
+    if app.config['DB_AUTO_MIGRATE'] and not db.cli_manages_schema():
+        with app.app_context():
+            db.upgrade_db()
 
     # Routen registrieren
     from . import routes
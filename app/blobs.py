@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+from flask import current_app
+
+try:
+    from .db import begin_immediate, get_read_db
+except ImportError:
+    # Fallback for direct module execution
+    from db import begin_immediate, get_read_db
+
+# Dateiendung pro Format im Blob-Store (Format aus den Magic Bytes, nicht aus dem Upload-Namen)
+BLOB_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'gif': 'gif', 'webp': 'webp'}
+_PREFIX = re.compile(r'[0-9a-f]{16,64}')
+_CHUNK = 1024 * 1024
+
+# Hash-Präfix (URL) -> (sha256, format); Inhalt adressiert, also nie veraltet. Pro Prozess.
+_lookups = {}
+_lock = threading.Lock()
+
+
+def sniff_format(head: bytes) -> str | None:
+    """Format anhand der Magic Bytes (allowed_file prüft nur die Endung)."""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def sha256_file(path: str) -> tuple:
+    """(voller SHA-256, Format laut Magic Bytes) einer Datei."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        head = fh.read(16)
+        digest.update(head)
+        for chunk in iter(lambda: fh.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), sniff_format(head)
+
+
+def blob_dir(digest: str) -> str:
+    """static/blobs/ab/cd: zwei Ebenen, damit kein Ordner zehntausende Einträge bekommt."""
+    return os.path.join(current_app.static_folder, 'blobs', digest[:2], digest[2:4])
+
+
+def blob_path(digest: str, fmt: str) -> str:
+    return os.path.join(blob_dir(digest), f'{digest}.{BLOB_EXTENSIONS.get(fmt, fmt)}')
+
+
+def store_blob(db, src_path: str, digest: str, fmt: str) -> str:
+    """
+    Legt src_path unter seinem Hash ab (verschiebt; existiert der Blob schon,
+    wird src_path nur gelöscht) und trägt ihn in blobs ein. Im Write-Lock
+    aufrufen, damit release_blob ihn nicht parallel wegräumt.
+    """
+    target = blob_path(digest, fmt)
+    if os.path.exists(target):
+        os.remove(src_path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(src_path, target)
+    db.execute(
+        'INSERT OR IGNORE INTO blobs (hash, format, size, created_at) VALUES (?, ?, ?, ?)',
+        (digest, fmt, os.path.getsize(target), datetime.now().isoformat())
+    )
+    return target
+
+
+def release_blob(db, digest: str) -> list:
+    """
+    Trägt den Blob aus blobs aus, wenn keine Bildzeile (egal welches Jahr) ihn
+    mehr referenziert. In derselben Transaktion wie das DELETE auf images.
+    Gibt die zu löschenden Dateien zurück (Blob + Ableitungen); löschen erst
+    nach dem Commit mit remove_blob_files, sonst fehlen sie bei einem Rollback.
+    """
+    if db.execute('SELECT 1 FROM images WHERE blob_hash = ? LIMIT 1', (digest,)).fetchone():
+        return []
+    db.execute('DELETE FROM blobs WHERE hash = ?', (digest,))
+    folder = blob_dir(digest)
+    if not os.path.isdir(folder):
+        return []
+    # <hash>.<ext> und <hash>.<breite>.<format>
+    return [os.path.join(folder, name) for name in os.listdir(folder) if name.startswith(f'{digest}.')]
+
+
+def remove_blob_files(db, digest: str, paths: list) -> None:
+    """
+    Nach dem Commit von release_blob: Dateien im Write-Lock löschen, außer
+    derselbe Inhalt wurde inzwischen neu hochgeladen (blobs-Zeile wieder da).
+    """
+    if not paths:
+        return
+    begin_immediate(db)
+    try:
+        if db.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone():
+            return
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    finally:
+        # Nur gelesen; der Lock hält store_blob während des Löschens fern
+        db.rollback()
+
+
+def find_blob(prefix: str) -> tuple | None:
+    """(sha256, format) zu einem Hash-Präfix aus der URL, per Range-Lookup auf dem PK."""
+    if not _PREFIX.fullmatch(prefix or ''):
+        return None
+    cached = _lookups.get(prefix)
+    if cached is not None:
+        return cached
+    # Hex-Ziffern enden bei 'f' -> prefix..prefix+'g' umfasst genau alle Hashes mit diesem Präfix
+    row = get_read_db().execute(
+        'SELECT hash, format FROM blobs WHERE hash >= ? AND hash < ? LIMIT 1',
+        (prefix, prefix + 'g')
+    ).fetchone()
+    if row is None:
+        return None
+    found = (row['hash'], row['format'])
+    with _lock:
+        _lookups[prefix] = found
+    return found
@@ -1,21 +1,189 @@
+from contextlib import contextmanager
 from datetime import datetime
 import os
+import queue
+import re
 import shutil
 import sqlite3
+import sys
+import threading
+import time
 import click
 from flask import current_app, g
 from flask.cli import with_appcontext
 
+# PRAGMAs für jede neue Verbindung (WAL: Leser blockieren keine Schreiber)
+CONNECTION_PRAGMAS = (
+    'PRAGMA busy_timeout = {busy_timeout}',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA mmap_size = {mmap_size}',
+    'PRAGMA cache_size = {cache_size}',
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+class ConnectionPool:
+    """
+    Begrenzter Pool vorkonfigurierter SQLite-Verbindungen (pro Prozess).
+
+    readonly=True öffnet die DB mit mode=ro + query_only, damit Lese-Endpoints
+    nie hinter Vote-Writes anstehen. Ist der Pool erschöpft, wartet acquire()
+    bis zu `timeout` Sekunden auf eine freie Verbindung.
+    """
+
+    def __init__(self, path: str, size: int, readonly: bool = False, busy_timeout_ms: int = 5000,
+                 mmap_size: int = 256 * 1024 * 1024, cache_size: int = -16000, statement_cache: int = 256,
+                 timeout: float = 10.0):
+        self.path = path
+        self.size = size
+        self.readonly = readonly
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.statement_cache = statement_cache
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'created': 0, 'lock_retries': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False,
+                                   timeout=self.busy_timeout_ms / 1000, cached_statements=self.statement_cache)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False,
+                                   timeout=self.busy_timeout_ms / 1000, cached_statements=self.statement_cache)
+            conn.execute('PRAGMA journal_mode = WAL')
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma.format(busy_timeout=self.busy_timeout_ms, mmap_size=self.mmap_size,
+                                       cache_size=self.cache_size))
+        if self.readonly:
+            conn.execute('PRAGMA query_only = 1')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    self.stats['created'] += 1
+                    create = True
+                else:
+                    create = False
+                    self.stats['waits'] += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.monotonic()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError('Kein freier DB-Slot im Pool (Timeout)')
+                finally:
+                    self.count('wait_seconds', time.monotonic() - started)
+        self.count('checkouts')
+        return conn
+
+    def count(self, key: str, amount: float = 1) -> None:
+        """Zähler in stats erhöhen (mehrere Request-Threads teilen sich den Pool)."""
+        with self._lock:
+            self.stats[key] += amount
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'size': self.size, 'open': self._created, 'idle': self._idle.qsize()}
+
+
+def _pools() -> dict:
+    """Pools pro Prozess (nach fork eines Workers werden sie neu aufgebaut)."""
+    app = current_app._get_current_object()
+    pools = app.extensions.get('db_pools')
+    if pools is None or pools['pid'] != os.getpid():
+        cfg = app.config
+        common = dict(busy_timeout_ms=cfg['DB_BUSY_TIMEOUT_MS'], mmap_size=cfg['DB_MMAP_SIZE'],
+                      cache_size=cfg['DB_CACHE_SIZE'])
+        pools = {
+            'pid': os.getpid(),
+            'writer': ConnectionPool(cfg['DATABASE'], cfg['DB_WRITER_POOL_SIZE'], **common),
+            'reader': ConnectionPool(cfg['DATABASE'], cfg['DB_READER_POOL_SIZE'], readonly=True, **common),
+        }
+        app.extensions['db_pools'] = pools
+    return pools
+
+
 def get_db():
+    """Schreib-Verbindung für den aktuellen Request (aus dem Writer-Pool)."""
     if 'db' not in g:
-        g.db = sqlite3.connect(current_app.config['DATABASE'])
-        g.db.row_factory = sqlite3.Row
+        g.db = _pools()['writer'].acquire()
     return g.db
 
+
+def get_read_db():
+    """Read-only Verbindung (eigener Pool, wartet nicht auf Vote-Writes)."""
+    if 'read_db' not in g:
+        g.read_db = _pools()['reader'].acquire()
+    return g.read_db
+
+
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        _pools()['writer'].release(db)
+    read_db = g.pop('read_db', None)
+    if read_db is not None:
+        _pools()['reader'].release(read_db)
+
+
+def begin_immediate(db, attempts: int = 5, pool: 'ConnectionPool | None' = None) -> None:
+    """
+    BEGIN IMMEDIATE mit Retry, falls busy_timeout trotzdem 'database is locked' liefert.
+    pool: zählt lock_retries (Standard: Writer-Pool der App; ohne App-Kontext,
+    z.B. im Write-Queue-Thread, den eigenen Pool übergeben).
+    Eine schon offene Transaktion ist ein Fehler des Aufrufers: nicht still
+    committen, sonst landen halbe Änderungen außerhalb der neuen Transaktion.
+    """
+    if db.in_transaction:
+        raise sqlite3.ProgrammingError('begin_immediate: Verbindung hat bereits eine offene Transaktion')
+    for attempt in range(attempts):
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == attempts - 1:
+                raise
+            (pool if pool is not None else _pools()['writer']).count('lock_retries')
+            time.sleep(0.05 * (attempt + 1))
+
+
+def pool_stats() -> dict:
+    pools = _pools()
+    return {'writer': pools['writer'].snapshot(), 'reader': pools['reader'].snapshot()}
+
 
 def _ensure_column(db, table_name: str, column_name: str, ddl: str):
     cols = db.execute(f"PRAGMA table_info({table_name})").fetchall()
@@ -225,7 +393,8 @@ def migrate_vote_generic_columns(default_legacy_year: int = 2025) -> None:
 
 
 
-def init_db():
+def create_schema():
+    """Migration 1: Basisschema, Seeds und Legacy-Anpassungen bestehender DBs."""
     db = get_db()
     db.executescript('''
         CREATE TABLE IF NOT EXISTS images (
@@ -361,8 +530,671 @@ def init_db():
     db.commit()
 
 
+def migrate_legacy_2025_visibility(default_legacy_year: int = 2025) -> None:
+    """Migration 2: Upload-Ordner pro Jahr, NULL-Jahre, 2025er Bilder sichtbar (lief früher bei jedem Boot)."""
+    migrate_uploads_to_year_dirs(default_legacy_year=default_legacy_year)
+    migrate_null_years(default_legacy_year=default_legacy_year)
+    db = get_db()
+    db.execute('UPDATE images SET visible = 1 WHERE contest_year = ?', (default_legacy_year,))
+    db.commit()
+
+
+# ---- Index-Set für die Hot-Paths (votes, reactions, duel_votes, images) ----
+# Name -> DDL. Spalten so gewählt, dass die Route-Queries ohne Table-Lookup
+# auskommen (covering). `flask check-query-plans` prüft die Pläne dagegen.
+INDEXES = {
+    # Ballot eines Voters (vote, voter_state, contest_year, VoteEngine)
+    'idx_votes_voter_year': 'votes (voter_session_id, contest_year, image_id, vote_option_key, vote_value, vote_label)',
+    # Jahres-Auswertung (total_votes, DISTINCT voters, Reset pro Jahr)
+    'idx_votes_year_voter': 'votes (contest_year, voter_session_id)',
+    # Ranking-Join votes -> images
+    'idx_votes_image_year': 'votes (image_id, contest_year, vote_value)',
+    # Reaktionszähler pro Bild (react) + Ranking-Join
+    'idx_reactions_image_year_type': 'reactions (image_id, contest_year, reaction_type)',
+    # Reaktionen eines Voters (contest_year)
+    'idx_reactions_voter_year': 'reactions (voter_session_id, contest_year, image_id, reaction_type)',
+    'idx_reactions_year': 'reactions (contest_year)',
+    # Spin-Limit pro Voter (duel_spins_used)
+    'idx_duel_votes_voter_year': 'duel_votes (voter_session_id, contest_year)',
+    'idx_duel_votes_year': 'duel_votes (contest_year)',
+    # Galerie / Upload-Liste
+    'idx_images_year_visible_uploaded': 'images (contest_year, visible, uploaded_at)',
+    'idx_images_year_uploaded': 'images (contest_year, uploaded_at)',
+    'idx_stickers_year_sort': 'stickers (contest_year, active, sort_order)',
+    # Leaderboard: eine Zeile pro Bild, sortiert nach Score
+    'idx_image_scores_rank': 'image_scores (contest_year, weighted_score DESC, vote_count DESC)',
+    # Duel-Paarungen (Bradley-Terry-Fit) + Duel-Ranking
+    'idx_duel_outcomes_year_pair': 'duel_outcomes (contest_year, winner_id, loser_id)',
+    'idx_duel_ratings_rank': 'duel_ratings (contest_year, rating DESC)',
+    # Blob-Store: Referenzzähler/Dedupe pro Jahr + Auflösung alter URLs ohne Hash
+    'idx_images_blob': 'images (blob_hash, contest_year)',
+    'idx_images_year_filename': 'images (contest_year, filename)',
+}
+
+# Indizes auf Spalten, die erst eine spätere Migration anlegt: Index -> (Tabelle, Spalte).
+# Nur diese werden übersprungen, solange die Spalte fehlt; jeder andere Fehler schlägt durch.
+LATE_INDEX_COLUMNS = {
+    'idx_images_blob': ('images', 'blob_hash'),  # Migration 12
+}
+
+
+def ensure_indexes() -> None:
+    """Legt alle Indizes aus INDEXES an (IF NOT EXISTS, beliebig oft ausführbar)."""
+    db = get_db()
+    tables = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+    for name, target in INDEXES.items():
+        # Tabellen späterer Migrationen existieren evtl. noch nicht
+        if target.split(' ', 1)[0] not in tables:
+            continue
+        late = LATE_INDEX_COLUMNS.get(name)
+        if late is not None:
+            table_name, column_name = late
+            if column_name not in {c[1] for c in db.execute(f'PRAGMA table_info({table_name})').fetchall()}:
+                continue
+        db.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+    db.commit()
+
+
+def create_config_version() -> None:
+    """Migration 4: Versionszähler für gecachte Jahres-Konfiguration (Settings + Vote-Optionen)."""
+    db = get_db()
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS config_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+    db.execute('INSERT INTO config_version (id, version) VALUES (1, 1) ON CONFLICT(id) DO NOTHING')
+    db.commit()
+
+
+def migrate_publish_state() -> None:
+    """Migration 5: Publish-Status als Spalten statt published_flag_<year>.txt."""
+    db = get_db()
+    _ensure_column(db, 'contest_year_settings', 'published', 'published INTEGER DEFAULT 0')
+    _ensure_column(db, 'contest_year_settings', 'publish_at', 'publish_at TEXT')
+
+    # Alte Flag-Dateien einmalig übernehmen
+    root = current_app.root_path
+    for name in os.listdir(root):
+        if not (name.startswith('published_flag_') and name.endswith('.txt')):
+            continue
+        year_part = name[len('published_flag_'):-len('.txt')]
+        if not year_part.isdigit():
+            continue
+        with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+            published = 1 if f.read().strip() == '1' else 0
+        db.execute('''
+            INSERT INTO contest_year_settings (contest_year, published, created_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(contest_year) DO UPDATE SET published = excluded.published
+        ''', (int(year_part), published, datetime.now().isoformat()))
+
+    db.execute('UPDATE config_version SET version = version + 1 WHERE id = 1')
+    db.commit()
+
+
+# ---- Leaderboard (image_scores) ----
+# Eine Zeile pro Bild und Jahr. Die Trigger halten die Zähler im selben
+# Commit wie der Vote/die Reaktion aktuell, egal welcher Pfad schreibt
+# (vote, react, Resets, delete_image). Gewichte wie im alten Ranking-SQL:
+# hype/creative x2, funny/underrated x1, Votes mit vote_value.
+SCORE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS image_scores (
+        contest_year INTEGER NOT NULL,
+        image_id INTEGER NOT NULL,
+        vote_count INTEGER NOT NULL DEFAULT 0,
+        vote_points INTEGER NOT NULL DEFAULT 0,
+        hype_count INTEGER NOT NULL DEFAULT 0,
+        creative_count INTEGER NOT NULL DEFAULT 0,
+        funny_count INTEGER NOT NULL DEFAULT 0,
+        underrated_count INTEGER NOT NULL DEFAULT 0,
+        weighted_score INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (contest_year, image_id)
+    );
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_images_ai AFTER INSERT ON images BEGIN
+        INSERT OR IGNORE INTO image_scores (contest_year, image_id) VALUES (new.contest_year, new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_images_ad AFTER DELETE ON images BEGIN
+        DELETE FROM image_scores WHERE contest_year = old.contest_year AND image_id = old.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_votes_ai AFTER INSERT ON votes BEGIN
+        INSERT INTO image_scores (contest_year, image_id, vote_count, vote_points, weighted_score)
+        VALUES (new.contest_year, new.image_id, 1, COALESCE(new.vote_value, 0), COALESCE(new.vote_value, 0))
+        ON CONFLICT(contest_year, image_id) DO UPDATE SET
+            vote_count = vote_count + 1,
+            vote_points = vote_points + excluded.vote_points,
+            weighted_score = weighted_score + excluded.vote_points;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_votes_ad AFTER DELETE ON votes BEGIN
+        UPDATE image_scores SET
+            vote_count = vote_count - 1,
+            vote_points = vote_points - COALESCE(old.vote_value, 0),
+            weighted_score = weighted_score - COALESCE(old.vote_value, 0)
+        WHERE contest_year = old.contest_year AND image_id = old.image_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_votes_au AFTER UPDATE OF image_id, contest_year, vote_value ON votes BEGIN
+        UPDATE image_scores SET
+            vote_count = vote_count - 1,
+            vote_points = vote_points - COALESCE(old.vote_value, 0),
+            weighted_score = weighted_score - COALESCE(old.vote_value, 0)
+        WHERE contest_year = old.contest_year AND image_id = old.image_id;
+        INSERT INTO image_scores (contest_year, image_id, vote_count, vote_points, weighted_score)
+        VALUES (new.contest_year, new.image_id, 1, COALESCE(new.vote_value, 0), COALESCE(new.vote_value, 0))
+        ON CONFLICT(contest_year, image_id) DO UPDATE SET
+            vote_count = vote_count + 1,
+            vote_points = vote_points + excluded.vote_points,
+            weighted_score = weighted_score + excluded.vote_points;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_reactions_ai AFTER INSERT ON reactions BEGIN
+        INSERT INTO image_scores (contest_year, image_id, hype_count, creative_count, funny_count, underrated_count, weighted_score)
+        VALUES (
+            new.contest_year, new.image_id,
+            new.reaction_type = 'hype', new.reaction_type = 'creative',
+            new.reaction_type = 'funny', new.reaction_type = 'underrated',
+            CASE new.reaction_type WHEN 'hype' THEN 2 WHEN 'creative' THEN 2 WHEN 'funny' THEN 1 WHEN 'underrated' THEN 1 ELSE 0 END
+        )
+        ON CONFLICT(contest_year, image_id) DO UPDATE SET
+            hype_count = hype_count + excluded.hype_count,
+            creative_count = creative_count + excluded.creative_count,
+            funny_count = funny_count + excluded.funny_count,
+            underrated_count = underrated_count + excluded.underrated_count,
+            weighted_score = weighted_score + excluded.weighted_score;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS image_scores_reactions_ad AFTER DELETE ON reactions BEGIN
+        UPDATE image_scores SET
+            hype_count = hype_count - (old.reaction_type = 'hype'),
+            creative_count = creative_count - (old.reaction_type = 'creative'),
+            funny_count = funny_count - (old.reaction_type = 'funny'),
+            underrated_count = underrated_count - (old.reaction_type = 'underrated'),
+            weighted_score = weighted_score
+                - CASE old.reaction_type WHEN 'hype' THEN 2 WHEN 'creative' THEN 2 WHEN 'funny' THEN 1 WHEN 'underrated' THEN 1 ELSE 0 END
+        WHERE contest_year = old.contest_year AND image_id = old.image_id;
+    END;
+'''
+
+
+def rebuild_scores(year: int | None = None) -> int:
+    """Berechnet image_scores komplett neu (alle Jahre oder ein Jahr). Gibt die Zeilenzahl zurück."""
+    db = get_db()
+    where, params = ('WHERE images.contest_year = ?', (year,)) if year is not None else ('', ())
+    db.execute('DELETE FROM image_scores' + (' WHERE contest_year = ?' if year is not None else ''), params)
+    # Votes und Reaktionen getrennt aggregieren (kein votes x reactions Kreuzprodukt)
+    db.execute(f'''
+        INSERT INTO image_scores
+            (contest_year, image_id, vote_count, vote_points, hype_count, creative_count, funny_count, underrated_count, weighted_score)
+        SELECT
+            images.contest_year,
+            images.id,
+            COALESCE(v.vote_count, 0),
+            COALESCE(v.vote_points, 0),
+            COALESCE(r.hype_count, 0),
+            COALESCE(r.creative_count, 0),
+            COALESCE(r.funny_count, 0),
+            COALESCE(r.underrated_count, 0),
+            COALESCE(v.vote_points, 0)
+              + COALESCE(r.hype_count, 0) * 2 + COALESCE(r.creative_count, 0) * 2
+              + COALESCE(r.funny_count, 0) + COALESCE(r.underrated_count, 0)
+        FROM images
+        LEFT JOIN (
+            SELECT image_id, contest_year, COUNT(*) AS vote_count, COALESCE(SUM(vote_value), 0) AS vote_points
+            FROM votes GROUP BY image_id, contest_year
+        ) v ON v.image_id = images.id AND v.contest_year = images.contest_year
+        LEFT JOIN (
+            SELECT image_id, contest_year,
+                SUM(reaction_type = 'hype') AS hype_count,
+                SUM(reaction_type = 'creative') AS creative_count,
+                SUM(reaction_type = 'funny') AS funny_count,
+                SUM(reaction_type = 'underrated') AS underrated_count
+            FROM reactions GROUP BY image_id, contest_year
+        ) r ON r.image_id = images.id AND r.contest_year = images.contest_year
+        {where}
+    ''', params)
+    count = db.execute(
+        'SELECT COUNT(*) FROM image_scores' + (' WHERE contest_year = ?' if year is not None else ''), params
+    ).fetchone()[0]
+    db.commit()
+    return count
+
+
+def create_image_scores() -> None:
+    """Migration 6: Leaderboard-Tabelle + Trigger anlegen und einmal voll aufbauen."""
+    db = get_db()
+    db.executescript(SCORE_SCHEMA)
+    ensure_indexes()
+    rebuild_scores()
+
+
+def create_duel_outcomes() -> None:
+    """Migration 7: Paarweise Duel-Ergebnisse + Ratings, spin_id gegen doppelte Wertung."""
+    db = get_db()
+    _ensure_column(db, 'duel_votes', 'spin_id', 'spin_id TEXT')
+    db.executescript('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_duel_votes_spin ON duel_votes (spin_id) WHERE spin_id IS NOT NULL;
+
+        CREATE TABLE IF NOT EXISTS duel_outcomes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            contest_year INTEGER NOT NULL,
+            duel_vote_id INTEGER,
+            winner_id INTEGER NOT NULL,
+            loser_id INTEGER NOT NULL,
+            created_at TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS duel_ratings (
+            contest_year INTEGER NOT NULL,
+            image_id INTEGER NOT NULL,
+            rating REAL NOT NULL DEFAULT 1500,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (contest_year, image_id)
+        );
+    ''')
+    ensure_indexes()
+
+
+# ---- Zähler pro Voter und Jahr (voter_year_stats) ----
+# Spins, Votes und benutzte Option-Keys als eine Zeile pro Voter/Jahr, per
+# Trigger im selben Commit wie der Write gepflegt. Limits (10 Spins,
+# max_actions) sind damit ein Single-Row-Lookup statt COUNT(*).
+VOTER_STATS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS voter_year_stats (
+        voter_session_id TEXT NOT NULL,
+        contest_year INTEGER NOT NULL,
+        spins_used INTEGER NOT NULL DEFAULT 0,
+        vote_count INTEGER NOT NULL DEFAULT 0,
+        used_keys TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (voter_session_id, contest_year)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS voter_stats_votes_ai AFTER INSERT ON votes BEGIN
+        INSERT INTO voter_year_stats (voter_session_id, contest_year, vote_count, used_keys)
+        VALUES (new.voter_session_id, new.contest_year, 1, COALESCE(new.vote_option_key, ''))
+        ON CONFLICT(voter_session_id, contest_year) DO UPDATE SET
+            vote_count = vote_count + 1,
+            used_keys = CASE WHEN used_keys = '' THEN excluded.used_keys ELSE used_keys || ',' || excluded.used_keys END;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS voter_stats_votes_ad AFTER DELETE ON votes BEGIN
+        UPDATE voter_year_stats SET
+            vote_count = vote_count - 1,
+            used_keys = COALESCE((
+                SELECT group_concat(COALESCE(vote_option_key, ''), ',') FROM votes
+                WHERE voter_session_id = old.voter_session_id AND contest_year = old.contest_year
+            ), '')
+        WHERE voter_session_id = old.voter_session_id AND contest_year = old.contest_year;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS voter_stats_votes_au AFTER UPDATE OF voter_session_id, contest_year, vote_option_key ON votes BEGIN
+        -- wie image_scores_votes_au: alte Zeile austragen, neue eintragen; Keys frisch aus votes
+        UPDATE voter_year_stats SET
+            vote_count = vote_count - 1,
+            used_keys = COALESCE((
+                SELECT group_concat(COALESCE(vote_option_key, ''), ',') FROM votes
+                WHERE voter_session_id = old.voter_session_id AND contest_year = old.contest_year
+            ), '')
+        WHERE voter_session_id = old.voter_session_id AND contest_year = old.contest_year;
+        INSERT INTO voter_year_stats (voter_session_id, contest_year, vote_count, used_keys)
+        VALUES (new.voter_session_id, new.contest_year, 1, COALESCE(new.vote_option_key, ''))
+        ON CONFLICT(voter_session_id, contest_year) DO UPDATE SET
+            vote_count = vote_count + 1,
+            used_keys = COALESCE((
+                SELECT group_concat(COALESCE(vote_option_key, ''), ',') FROM votes
+                WHERE voter_session_id = new.voter_session_id AND contest_year = new.contest_year
+            ), '');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS voter_stats_duel_ai AFTER INSERT ON duel_votes BEGIN
+        INSERT INTO voter_year_stats (voter_session_id, contest_year, spins_used)
+        VALUES (new.voter_session_id, new.contest_year, 1)
+        ON CONFLICT(voter_session_id, contest_year) DO UPDATE SET spins_used = spins_used + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS voter_stats_duel_ad AFTER DELETE ON duel_votes BEGIN
+        UPDATE voter_year_stats SET spins_used = spins_used - 1
+        WHERE voter_session_id = old.voter_session_id AND contest_year = old.contest_year;
+    END;
+'''
+
+
+def rebuild_voter_stats() -> None:
+    """Baut voter_year_stats komplett aus votes + duel_votes neu auf."""
+    db = get_db()
+    db.execute('DELETE FROM voter_year_stats')
+    db.execute('''
+        INSERT INTO voter_year_stats (voter_session_id, contest_year, vote_count, used_keys)
+        SELECT voter_session_id, contest_year, COUNT(*), group_concat(COALESCE(vote_option_key, ''), ',')
+        FROM votes
+        WHERE voter_session_id IS NOT NULL AND contest_year IS NOT NULL
+        GROUP BY voter_session_id, contest_year
+    ''')
+    db.execute('''
+        INSERT INTO voter_year_stats (voter_session_id, contest_year, spins_used)
+        SELECT voter_session_id, contest_year, COUNT(*)
+        FROM duel_votes
+        WHERE contest_year IS NOT NULL
+        GROUP BY voter_session_id, contest_year
+        ON CONFLICT(voter_session_id, contest_year) DO UPDATE SET spins_used = excluded.spins_used
+    ''')
+    db.commit()
+
+
+def create_voter_stats() -> None:
+    """Migration 8: voter_year_stats + Trigger anlegen und einmal aufbauen."""
+    db = get_db()
+    db.executescript(VOTER_STATS_SCHEMA)
+    rebuild_voter_stats()
+
+
+def add_image_derivatives() -> None:
+    """Migration 9: images.derivatives (JSON {format: [breiten]} der gerenderten Ableitungen)."""
+    db = get_db()
+    _ensure_column(db, 'images', 'derivatives', 'derivatives TEXT')
+    db.commit()
+
+
+def add_content_hashes() -> None:
+    """Migration 10: content_hash für Bilder/Sticker (gehashte, immutable Media-URLs) + Backfill."""
+    from .media import file_hash
+
+    db = get_db()
+    _ensure_column(db, 'images', 'content_hash', 'content_hash TEXT')
+    _ensure_column(db, 'stickers', 'content_hash', 'content_hash TEXT')
+    static = current_app.static_folder
+
+    for row in db.execute('SELECT id, filename, contest_year FROM images WHERE content_hash IS NULL').fetchall():
+        path = os.path.join(static, f'uploads_{row["contest_year"]}', row['filename'])
+        if os.path.isfile(path):
+            db.execute('UPDATE images SET content_hash = ? WHERE id = ?', (file_hash(path), row['id']))
+
+    for row in db.execute('SELECT id, filename, contest_year FROM stickers WHERE content_hash IS NULL').fetchall():
+        for folder in (f'stickers_{row["contest_year"]}', 'stickers'):
+            path = os.path.join(static, folder, row['filename'])
+            if os.path.isfile(path):
+                db.execute('UPDATE stickers SET content_hash = ? WHERE id = ?', (file_hash(path), row['id']))
+                break
+    db.commit()
 
 
+UPLOAD_JOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS upload_jobs (
+    id TEXT PRIMARY KEY,
+    contest_year INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    saved INTEGER NOT NULL DEFAULT 0,
+    errors TEXT,
+    created_at TEXT NOT NULL,
+    finished_at TEXT
+);
+'''
+
+
+def create_upload_jobs() -> None:
+    """Migration 11: Fortschritt der Upload-Jobs (prozessübergreifend pollbar)."""
+    db = get_db()
+    db.executescript(UPLOAD_JOBS_SCHEMA)
+    db.commit()
+
+
+BLOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+'''
+
+
+def create_blob_store() -> None:
+    """
+    Migration 12: Content-addressed Blob-Store (static/blobs/ab/cd/<sha256>.<ext>).
+    Verschiebt vorhandene Uploads samt Ableitungen dorthin und setzt
+    images.blob_hash; gleiche Dateien (auch über Jahre) teilen sich einen Blob.
+    Bilder, deren Datei fehlt, bleiben ohne blob_hash (Fallback uploads_<year>).
+    """
+    from .blobs import blob_dir, sha256_file, store_blob
+    from .media import HASH_LENGTH
+
+    db = get_db()
+    db.executescript(BLOBS_SCHEMA)
+    _ensure_column(db, 'images', 'blob_hash', 'blob_hash TEXT')
+    ensure_indexes()
+    static = current_app.static_folder
+
+    rows = db.execute(
+        'SELECT DISTINCT contest_year, filename FROM images WHERE blob_hash IS NULL AND contest_year IS NOT NULL'
+    ).fetchall()
+    for row in rows:
+        year, filename = row['contest_year'], row['filename']
+        path = os.path.join(static, f'uploads_{year}', filename)
+        if not os.path.isfile(path):
+            continue
+        digest, fmt = sha256_file(path)
+        fmt = fmt or filename.rsplit('.', 1)[-1].lower()
+
+        # Vorhandene Ableitungen (derived_<year>/<filename>.<breite>.<format>) mitnehmen
+        derived = os.path.join(static, f'derived_{year}')
+        if os.path.isdir(derived):
+            for name in os.listdir(derived):
+                suffix = name[len(filename):]
+                if name.startswith(filename) and re.fullmatch(r'\.\d+\.(avif|webp)', suffix):
+                    target = os.path.join(blob_dir(digest), digest + suffix)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    if os.path.exists(target):
+                        os.remove(os.path.join(derived, name))
+                    else:
+                        shutil.move(os.path.join(derived, name), target)
+
+        store_blob(db, path, digest, fmt)
+        db.execute(
+            'UPDATE images SET blob_hash = ?, content_hash = ? WHERE contest_year = ? AND filename = ?',
+            (digest, digest[:HASH_LENGTH], year, filename)
+        )
+    db.commit()
+
+
+def add_image_metadata() -> None:
+    """
+    Migration 13: Abmessungen (nach EXIF-Drehung), Orientation und LQIP-Platzhalter.
+    Nur Spalten; Bestandsbilder füllt `flask backfill-image-meta`.
+    """
+    db = get_db()
+    _ensure_column(db, 'images', 'width', 'width INTEGER')
+    _ensure_column(db, 'images', 'height', 'height INTEGER')
+    _ensure_column(db, 'images', 'orientation', 'orientation INTEGER')
+    _ensure_column(db, 'images', 'placeholder', 'placeholder TEXT')
+    db.commit()
+
+
+# ---- Änderungszähler der Scores pro Jahr ----
+# Jede Zeilenänderung in image_scores (Vote, Tausch, Reaktion, Reset,
+# rebuild_scores) zählt score_versions.version hoch. Aggregate wie
+# COUNT/SUM bleiben bei einem Tausch gleich, der Zähler nicht.
+SCORE_VERSION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS score_versions (
+        contest_year INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS score_versions_ai AFTER INSERT ON image_scores BEGIN
+        INSERT INTO score_versions (contest_year, version) VALUES (new.contest_year, 1)
+        ON CONFLICT(contest_year) DO UPDATE SET version = version + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS score_versions_au AFTER UPDATE ON image_scores BEGIN
+        INSERT INTO score_versions (contest_year, version) VALUES (new.contest_year, 1)
+        ON CONFLICT(contest_year) DO UPDATE SET version = version + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS score_versions_ad AFTER DELETE ON image_scores BEGIN
+        INSERT INTO score_versions (contest_year, version) VALUES (old.contest_year, 1)
+        ON CONFLICT(contest_year) DO UPDATE SET version = version + 1;
+    END;
+'''
+
+
+def create_score_versions() -> None:
+    """Migration 14: Änderungszähler pro Jahr für Snapshot-/Live-Stempel."""
+    db = get_db()
+    db.executescript(SCORE_VERSION_SCHEMA)
+    db.execute('''
+        INSERT INTO score_versions (contest_year, version)
+        SELECT DISTINCT contest_year, 1 FROM image_scores WHERE true
+        ON CONFLICT(contest_year) DO NOTHING
+    ''')
+    db.commit()
+
+
+def backfill_uploaded_at() -> None:
+    """
+    Migration 15: Altbestand mit uploaded_at NULL auf '' setzen. Die Keyset-
+    Pagination vergleicht (uploaded_at, id) < (?, ?); mit NULL ist das nie wahr
+    und die Bilder fielen aus dem Infinite Scroll. '' sortiert als ältestes.
+    """
+    db = get_db()
+    db.execute("UPDATE images SET uploaded_at = '' WHERE uploaded_at IS NULL")
+    # Gecachte Galerie-Seiten aller Worker neu aufbauen
+    db.execute('UPDATE config_version SET version = version + 1 WHERE id = 1')
+    db.commit()
+
+
+def split_duel_ratings() -> None:
+    """
+    Migration 16: Bradley-Terry bekommt eine eigene Spalte (bt_rating). Bisher
+    überschrieb `flask fit-duel-ratings` die Elo-Spalte, danach rechnete
+    record_duel inkrementell auf BT-Werten weiter. Elo wird aus duel_outcomes
+    neu aufgebaut; BT füllt der nächste fit-duel-ratings-Lauf.
+    """
+    from .duel_ratings import replay_elo
+
+    db = get_db()
+    _ensure_column(db, 'duel_ratings', 'bt_rating', 'bt_rating REAL')
+    replay_elo(db)
+    db.commit()
+
+
+def add_voter_stats_update_trigger() -> None:
+    """
+    Migration 17: UPDATE-Trigger auf votes auch für voter_year_stats (image_scores
+    hatte ihn schon). Danach einmal neu aufbauen, falls Zeilen veraltet sind.
+    """
+    db = get_db()
+    db.executescript(VOTER_STATS_SCHEMA)
+    rebuild_voter_stats()
+
+
+def add_upload_job_heartbeat() -> None:
+    """Migration 18: Lebenszeichen der Upload-Jobs, damit hängengebliebene Jobs als fehlgeschlagen gelten."""
+    db = get_db()
+    _ensure_column(db, 'upload_jobs', 'heartbeat_at', 'heartbeat_at TEXT')
+    db.execute('UPDATE upload_jobs SET heartbeat_at = created_at WHERE heartbeat_at IS NULL')
+    db.commit()
+
+
+# ---- Versionierte Migrationen (PRAGMA user_version) ----
+# Jede Migration läuft genau einmal; danach wird user_version hochgezählt.
+# Neue Migrationen nur hinten anhängen und idempotent halten. upgrade_db
+# serialisiert über _migration_lock, falls mehrere Worker gleichzeitig booten.
+MIGRATIONS = [
+    (1, 'Basisschema + Seeds + generische Vote-Spalten', create_schema),
+    (2, 'Legacy-Daten 2025 (Ordner, NULL-Jahre, Sichtbarkeit)', migrate_legacy_2025_visibility),
+    (3, 'Index-Set für votes/reactions/duel_votes/images', ensure_indexes),
+    (4, 'config_version für Jahres-Config-Cache', create_config_version),
+    (5, 'Publish-Status in contest_year_settings', migrate_publish_state),
+    (6, 'Leaderboard image_scores + Trigger', create_image_scores),
+    (7, 'Duel-Paarungen + Ratings', create_duel_outcomes),
+    (8, 'Zähler pro Voter/Jahr (voter_year_stats)', create_voter_stats),
+    (9, 'Responsive Ableitungen (images.derivatives)', add_image_derivatives),
+    (10, 'Inhalts-Hashes für immutable Media-URLs', add_content_hashes),
+    (11, 'Upload-Jobs (Streaming-Upload mit Fortschritt)', create_upload_jobs),
+    (12, 'Content-addressed Blob-Store für Fotos', create_blob_store),
+    (13, 'Bild-Abmessungen + LQIP-Platzhalter', add_image_metadata),
+    (14, 'Änderungszähler der Scores pro Jahr', create_score_versions),
+    (15, 'Galerie-Cursor: uploaded_at ohne NULL', backfill_uploaded_at),
+    (16, 'Bradley-Terry getrennt von Elo (duel_ratings.bt_rating)', split_duel_ratings),
+    (17, 'UPDATE-Trigger für voter_year_stats', add_voter_stats_update_trigger),
+    (18, 'Lebenszeichen für Upload-Jobs (heartbeat_at)', add_upload_job_heartbeat),
+]
+
+
+def get_schema_version(readonly: bool = False) -> int:
+    if readonly:
+        # Read-only Verbindung: kein journal_mode-Umschalten, keine neue DB-Datei
+        if not os.path.exists(current_app.config['DATABASE']):
+            return 0
+        return get_read_db().execute('PRAGMA user_version').fetchone()[0]
+    return get_db().execute('PRAGMA user_version').fetchone()[0]
+
+
+def cli_manages_schema() -> bool:
+    """`flask db-upgrade` migriert bzw. prüft selbst; App-Start und run.py fassen das Schema dann nicht an."""
+    return 'db-upgrade' in sys.argv[1:]
+
+
+def _set_schema_version(version: int) -> None:
+    db = get_db()
+    # PRAGMA kann nicht parametrisiert werden
+    db.execute(f'PRAGMA user_version = {int(version)}')
+    db.commit()
+
+
+def pending_migrations(readonly: bool = False) -> list:
+    version = get_schema_version(readonly)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+# Wie lange ein Worker beim Boot auf die Migrationen eines anderen wartet (Sekunden)
+MIGRATION_LOCK_TIMEOUT = 600
+
+
+@contextmanager
+def _migration_lock():
+    """
+    Prozessübergreifender Lock für upgrade_db: BEGIN EXCLUSIVE auf einer
+    eigenen Lock-DB neben der App-DB. Ein BEGIN IMMEDIATE auf der App-DB
+    reicht nicht, die Migrationen committen selbst (db.commit, executescript)
+    und würden den Lock mittendrin freigeben. Stirbt der Prozess, gibt SQLite
+    den Lock frei.
+    """
+    conn = sqlite3.connect(f"{current_app.config['DATABASE']}.migrate-lock",
+                           timeout=MIGRATION_LOCK_TIMEOUT, isolation_level=None)
+    try:
+        conn.execute('BEGIN EXCLUSIVE')
+        yield
+    finally:
+        conn.close()
+
+
+def upgrade_db() -> list:
+    """Führt alle ausstehenden Migrationen aus und gibt die angewendeten Versionen zurück."""
+    applied = []
+    if get_schema_version() >= MIGRATIONS[-1][0]:
+        return applied
+    with _migration_lock():
+        for version, _description, migrate in MIGRATIONS:
+            # Version im Lock neu lesen (anderer Worker war evtl. schneller)
+            if version <= get_schema_version():
+                continue
+            migrate()
+            _set_schema_version(version)
+            applied.append(version)
+    return applied
+
+
+def init_db():
+    return upgrade_db()
+
 
 @click.command('init-db')
 @with_appcontext
@@ -370,6 +1202,50 @@ def init_db_command():
     init_db()
     click.echo('✔ Datenbank initialisiert.')
 
+
+@click.command('rebuild-scores')
+@click.option('--year', type=int, default=None, help='Nur dieses Jahr neu berechnen.')
+@with_appcontext
+def rebuild_scores_command(year):
+    count = rebuild_scores(year)
+    click.echo(f'✔ image_scores neu berechnet ({count} Bilder).')
+
+
+@click.command('db-upgrade')
+@click.option('--check', is_flag=True, help='Nur prüfen, ob Migrationen ausstehen (Exit-Code 1 falls ja).')
+@with_appcontext
+def db_upgrade_command(check):
+    if check:
+        # Nur lesen: weder Migrationen noch WAL-Umschaltung
+        pending = pending_migrations(readonly=True)
+        click.echo(f'Schema-Version: {get_schema_version(readonly=True)} / {MIGRATIONS[-1][0]}')
+        for version, description, _migrate in pending:
+            click.echo(f'  ausstehend: {version} – {description}')
+        if pending:
+            raise SystemExit(1)
+        click.echo('✔ Schema ist aktuell.')
+        return
+
+    applied = upgrade_db()
+    if applied:
+        click.echo(f'✔ Migrationen angewendet: {", ".join(str(v) for v in applied)}')
+    else:
+        click.echo('✔ Schema ist aktuell.')
+
+
 def init_app(app):
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(rebuild_scores_command)
+
+    from .query_plans import check_query_plans_command
+    from .duel_ratings import fit_duel_ratings_command
+    from .derivatives import build_derivatives_command, backfill_image_meta_command
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(fit_duel_ratings_command)
+    app.cli.add_command(build_derivatives_command)
+    app.cli.add_command(backfill_image_meta_command)
+
+    from .upload_jobs import import_photos_command
+    app.cli.add_command(import_photos_command)
@@ -0,0 +1,330 @@
+import atexit
+import base64
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+from PIL import ExifTags, Image, ImageOps, features
+
+try:
+    from .blobs import blob_dir, blob_path
+    from .db import begin_immediate, get_db
+    from .media import media_url
+    from .year_config import bump_config_version
+except ImportError:
+    # Fallback for direct module execution
+    from blobs import blob_dir, blob_path
+    from db import begin_immediate, get_db
+    from media import media_url
+    from year_config import bump_config_version
+
+# Breiten der Ableitungen (Karten ~140-400px, Reels ~300px, Galerie bis ~1280px auf Retina)
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_QUALITY = {'webp': 80, 'avif': 55}
+# Fallback-Breite für einfache <img src>-Vorschauen
+THUMB_WIDTH = 640
+# LQIP: längste Seite des Platzhalters (wird per CSS auf die Boxgröße gestreckt)
+PLACEHOLDER_SIZE = 16
+
+
+def derivative_formats() -> tuple:
+    """WebP immer, AVIF nur wenn Pillow mit AVIF-Support gebaut ist."""
+    return ('avif', 'webp') if features.check('avif') else ('webp',)
+
+
+def derived_name(filename: str, width: int, fmt: str) -> str:
+    # Auf der Platte: <sha256>.<breite>.<format> neben dem Blob; in der URL: <dateiname>.<breite>.<format>
+    return f'{filename}.{width}.{fmt}'
+
+
+def render_derivatives(src_path: str, out_dir: str, filename: str, formats: tuple, force: bool = False) -> dict:
+    """
+    Läuft im Worker-Prozess: erzeugt alle Breiten/Formate eines Originals.
+    Es wird nie hochskaliert; kleinere Originale bekommen nur ihre eigene Breite.
+    Gibt {format: [breiten]} zurück.
+    """
+    src_mtime = os.path.getmtime(src_path)
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        widths = sorted({min(w, image.width) for w in DERIVATIVE_WIDTHS})
+        result = {fmt: [] for fmt in formats}
+        for width in widths:
+            resized = None
+            for fmt in formats:
+                target = os.path.join(out_dir, derived_name(filename, width, fmt))
+                if force or not os.path.exists(target) or os.path.getmtime(target) < src_mtime:
+                    if resized is None:
+                        height = max(1, round(image.height * width / image.width))
+                        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    tmp_path = f'{target}.tmp'
+                    resized.save(tmp_path, fmt.upper(), quality=DERIVATIVE_QUALITY[fmt])
+                    os.replace(tmp_path, target)
+                result[fmt].append(width)
+    return result
+
+
+def image_metadata(src_path: str) -> dict:
+    """
+    Läuft im Worker-Prozess: Abmessungen wie angezeigt (nach EXIF-Drehung),
+    EXIF-Orientation und ein winziger WebP-Platzhalter als data:-URI.
+    """
+    with Image.open(src_path) as original:
+        orientation = original.getexif().get(ExifTags.Base.Orientation, 1)
+        width, height = original.size
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+        # JPEG nur grob dekodieren, für 16px reicht 1/8-Skalierung
+        original.draft('RGB', (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        buffer = io.BytesIO()
+        image.save(buffer, 'WEBP', quality=40)
+    placeholder = 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    return {'width': width, 'height': height, 'orientation': orientation, 'placeholder': placeholder}
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """
+    Prozessweiter Pool für CPU-Arbeit (Ableitungen, Upload-Prüfung).
+    spawn statt fork: der Webserver hält Threads und SQLite-Handles.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config['DERIVATIVE_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=True)
+
+
+def schedule_derivatives(rows: list) -> tuple:
+    """
+    Nach dem Upload-Commit: ein Render-Job pro Blob im Prozess-Pool (Zeilen
+    [id, blob_hash, format]). Teilt sich ein Bild den Blob mit einem anderen
+    Jahr, sind die Dateien schon da und der Job ist billig.
+    Gibt (digest -> Future, digest -> image_ids) für store_derivatives zurück.
+    """
+    pool = process_pool()
+    formats = derivative_formats()
+    logger = current_app.logger
+    futures = {}
+    image_ids = {}
+    for row in rows:
+        digest = row['blob_hash']
+        if digest not in futures:
+            future = pool.submit(render_derivatives, blob_path(digest, row['format']), blob_dir(digest),
+                                 digest, formats)
+
+            # Fehler auch dann protokollieren, wenn niemand mehr auf das Future wartet
+            def _log_failure(done, digest=digest) -> None:
+                if done.cancelled():
+                    return
+                exc = done.exception()
+                if exc is not None:
+                    logger.error('Ableitungen für Blob %s fehlgeschlagen', digest[:12], exc_info=exc)
+
+            future.add_done_callback(_log_failure)
+            futures[digest] = future
+        image_ids.setdefault(digest, []).append(row['id'])
+    return futures, image_ids
+
+
+def store_derivatives(db, futures: dict, image_ids: dict, on_error=None) -> tuple:
+    """
+    Wartet auf die Render-Jobs und schreibt images.derivatives für alle
+    Bildzeilen in EINER Transaktion. config_version wird nur gebumpt, wenn
+    sich dabei eine Zeile geändert hat. Gibt (ok, fehlgeschlagen) zurück.
+    """
+    updates = []
+    done = 0
+    failed = 0
+    for digest, future in futures.items():
+        try:
+            result = future.result()
+        except Exception as exc:
+            if on_error is not None:
+                on_error(digest, exc)
+            failed += len(image_ids[digest])
+            continue
+        value = json.dumps(result)
+        updates.extend((value, image_id, value) for image_id in image_ids[digest])
+        done += len(image_ids[digest])
+
+    if updates:
+        begin_immediate(db)
+        try:
+            changed = db.executemany(
+                'UPDATE images SET derivatives = ? WHERE id = ? AND derivatives IS NOT ?', updates
+            ).rowcount
+            # Gecachte Galerie-Seiten/Duel-Index aller Worker neu aufbauen
+            if changed:
+                bump_config_version(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return done, failed
+
+
+def build_derivatives(year: int, force: bool = False) -> tuple:
+    """Backfill für ein Jahr über den Prozess-Pool. Gibt (ok, fehlgeschlagen) zurück."""
+    db = get_db()
+    rows = db.execute(
+        '''
+        SELECT images.id, images.blob_hash, blobs.format
+        FROM images
+        LEFT JOIN blobs ON blobs.hash = images.blob_hash
+        WHERE images.contest_year = ?
+        ORDER BY images.id
+        ''',
+        (year,)
+    ).fetchall()
+    formats = derivative_formats()
+
+    pool = process_pool()
+    # Ein Job pro Blob, auch wenn mehrere Bildzeilen ihn teilen
+    futures = {}
+    image_ids = {}
+    missing = 0
+    for row in rows:
+        digest = row['blob_hash']
+        src_path = blob_path(digest, row['format']) if digest and row['format'] else None
+        if src_path is None or not os.path.exists(src_path):
+            missing += 1
+            continue
+        if digest not in futures:
+            futures[digest] = pool.submit(render_derivatives, src_path, blob_dir(digest), digest, formats, force)
+        image_ids.setdefault(digest, []).append(row['id'])
+
+    def report(digest: str, exc: Exception) -> None:
+        click.echo(f'  Blob {digest[:16]}: {exc}', err=True)
+
+    done, failed = store_derivatives(db, futures, image_ids, on_error=report)
+    return done, failed + missing
+
+
+def backfill_image_metadata(year: int | None = None, force: bool = False) -> tuple:
+    """Abmessungen/Orientation/Platzhalter für vorhandene Bilder nachtragen. Gibt (ok, fehlgeschlagen) zurück."""
+    db = get_db()
+    rows = db.execute(
+        '''
+        SELECT images.id, images.blob_hash, images.placeholder, blobs.format
+        FROM images
+        LEFT JOIN blobs ON blobs.hash = images.blob_hash
+        WHERE (? IS NULL OR images.contest_year = ?)
+        ''',
+        (year, year)
+    ).fetchall()
+
+    pool = process_pool()
+    futures = {}
+    image_ids = {}
+    missing = 0
+    for row in rows:
+        if row['placeholder'] and not force:
+            continue
+        digest = row['blob_hash']
+        src_path = blob_path(digest, row['format']) if digest and row['format'] else None
+        if src_path is None or not os.path.exists(src_path):
+            missing += 1
+            continue
+        if digest not in futures:
+            futures[digest] = pool.submit(image_metadata, src_path)
+        image_ids.setdefault(digest, []).append(row['id'])
+
+    done = 0
+    failed = missing
+    for digest, future in futures.items():
+        try:
+            meta = future.result()
+        except Exception as exc:
+            click.echo(f'  Blob {digest[:16]}: {exc}', err=True)
+            failed += len(image_ids[digest])
+            continue
+        db.executemany(
+            'UPDATE images SET width = ?, height = ?, orientation = ?, placeholder = ? WHERE id = ?',
+            [(meta['width'], meta['height'], meta['orientation'], meta['placeholder'], image_id)
+             for image_id in image_ids[digest]]
+        )
+        done += len(image_ids[digest])
+    bump_config_version(db)
+    db.commit()
+    return done, failed
+
+
+# ---- Template-Helfer ----
+
+def _content_hash(image) -> str | None:
+    return image['content_hash'] if 'content_hash' in image.keys() else None
+
+
+def _parse(image) -> dict:
+    raw = image['derivatives'] if 'derivatives' in image.keys() else None
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {}
+
+
+def _derived_url(year: int, image, width: int, fmt: str) -> str:
+    # Hash des Originals in der URL: neues Original -> neue URL (immutable cachebar)
+    return url_for('main.media_derived', year=year, content_hash=image['content_hash'],
+                   filename=derived_name(image['filename'], width, fmt))
+
+
+def derived_srcset(year: int, image, fmt: str = 'webp') -> str:
+    """srcset-String ("url 320w, url 640w, ...") oder '' solange nichts gerendert ist."""
+    if not _content_hash(image):
+        return ''
+    widths = _parse(image).get(fmt) or []
+    return ', '.join(f'{_derived_url(year, image, w, fmt)} {w}w' for w in widths)
+
+
+def thumb_url(year: int, image, width: int = THUMB_WIDTH) -> str:
+    """Kleinste WebP-Ableitung >= width (bzw. die größte vorhandene), sonst das Original."""
+    widths = _parse(image).get('webp') or []
+    if not widths or not _content_hash(image):
+        return media_url(year, image)
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return _derived_url(year, image, chosen, 'webp')
+
+
+@click.command('build-derivatives')
+@click.option('--year', type=int, required=True, help='Wettbewerbsjahr.')
+@click.option('--force', is_flag=True, help='Auch vorhandene Ableitungen neu rendern.')
+@with_appcontext
+def build_derivatives_command(year, force):
+    done, failed = build_derivatives(year, force)
+    click.echo(f'✔ Ableitungen für {year} erzeugt ({done} Bilder, {failed} fehlgeschlagen).')
+
+
+@click.command('backfill-image-meta')
+@click.option('--year', type=int, default=None, help='Nur dieses Wettbewerbsjahr.')
+@click.option('--force', is_flag=True, help='Auch Bilder mit vorhandenem Platzhalter neu berechnen.')
+@with_appcontext
+def backfill_image_meta_command(year, force):
+    done, failed = backfill_image_metadata(year, force)
+    click.echo(f'✔ Bild-Metadaten nachgetragen ({done} Bilder, {failed} fehlgeschlagen).')
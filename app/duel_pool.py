@@ -0,0 +1,91 @@
+import random
+import threading
+from collections import OrderedDict
+
+try:
+    from .db import get_read_db
+    from .year_config import config_version
+except ImportError:
+    # Fallback for direct module execution
+    from db import get_read_db
+    from year_config import config_version
+
+# Wie viele zuletzt gezeigte Tripel pro Voter gemerkt werden
+RECENT_TRIPLES_PER_VOTER = 50
+# Obergrenze gemerkter Voter pro Prozess (LRU)
+MAX_TRACKED_VOTERS = 10000
+# Neu-Ziehen, falls das Tripel schon gezeigt wurde
+MAX_RESAMPLE = 8
+
+
+class VisibleImageIndex:
+    """Sichtbare Bilder eines Jahres als Arrays (ids + Metadaten-Tupel) für O(1)-Sampling."""
+
+    def __init__(self, year: int, version: int, rows: list):
+        self.year = year
+        self.version = version
+        self.ids = [r['id'] for r in rows]
+        self.meta = [(r['id'], r['filename'], r['content_hash'], r['derivatives'], r['uploader'], r['description']) for r in rows]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+_indexes = {}
+_recent = OrderedDict()
+_lock = threading.Lock()
+
+
+def visible_index(year: int) -> VisibleImageIndex:
+    """Index neu laden, sobald config_version sich ändert (Upload, Sichtbarkeit, Löschen)."""
+    # Gleicher Stempel wie get_year_config & Co. (in g gecacht): höchstens ein
+    # PK-Lookup pro Request. Ohne ihn sähe ein Worker Ausblenden/Löschen
+    # in anderen Workern nicht.
+    version = config_version()
+    index = _indexes.get(year)
+    if index is not None and index.version == version:
+        return index
+    rows = get_read_db().execute(
+        'SELECT id, filename, content_hash, derivatives, uploader, description FROM images WHERE visible = 1 AND contest_year = ? ORDER BY id',
+        (year,)
+    ).fetchall()
+    index = VisibleImageIndex(year, version, rows)
+    with _lock:
+        _indexes[year] = index
+    return index
+
+
+def _remember(voter_session_id: str, year: int, triple: frozenset) -> None:
+    key = (voter_session_id, year)
+    with _lock:
+        seen = _recent.pop(key, None) or OrderedDict()
+        seen[triple] = True
+        while len(seen) > RECENT_TRIPLES_PER_VOTER:
+            seen.popitem(last=False)
+        _recent[key] = seen
+        while len(_recent) > MAX_TRACKED_VOTERS:
+            _recent.popitem(last=False)
+
+
+def sample_candidates(year: int, k: int = 3, voter_session_id: str | None = None) -> list:
+    """Zieht k verschiedene sichtbare Bilder ohne SQLite-Zugriff (außer bei Index-Reload)."""
+    index = visible_index(year)
+    n = len(index)
+    if n < k:
+        return []
+
+    seen = _recent.get((voter_session_id, year)) if voter_session_id else None
+    for _attempt in range(MAX_RESAMPLE):
+        positions = random.sample(range(n), k)
+        triple = frozenset(index.ids[p] for p in positions)
+        if not seen or triple not in seen:
+            break
+
+    if voter_session_id:
+        _remember(voter_session_id, year, triple)
+
+    return [
+        {'id': image_id, 'filename': filename, 'content_hash': content_hash, 'derivatives': derivatives,
+         'uploader': uploader, 'description': description}
+        for image_id, filename, content_hash, derivatives, uploader, description in (index.meta[p] for p in positions)
+    ]
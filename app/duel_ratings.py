@@ -0,0 +1,233 @@
+import math
+import uuid
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+try:
+    from .db import begin_immediate, get_db
+except ImportError:
+    # Fallback for direct module execution
+    from db import begin_immediate, get_db
+
+# Startwert / Skala wie Elo: 400 Punkte Abstand = 10:1 Gewinnchance
+BASE_RATING = 1500.0
+ELO_K = 24.0
+# Spin-Token gilt eine Stunde
+SPIN_TOKEN_MAX_AGE = 3600
+# Bradley-Terry (MM-Algorithmus nach Hunter 2004)
+BT_MAX_ITERATIONS = 200
+BT_TOLERANCE = 1e-7
+# Pseudo-Duelle gegen einen virtuellen Durchschnittsgegner (Stärke 1.0),
+# damit Bilder ohne Sieg/Niederlage endliche Ratings bekommen
+BT_PRIOR = 0.5
+
+
+class DuelRejected(Exception):
+    """Duel-Vote ungültig (Token, Limit, Replay)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='duel-spin')
+
+
+def issue_spin_token(year: int, candidate_ids: list, voter_session_id: str | None) -> str:
+    """Signiertes Token mit den gezeigten Kandidaten, damit der Vote alle Paarungen kennt."""
+    return _serializer().dumps({
+        'y': year,
+        'c': [int(i) for i in candidate_ids],
+        'v': voter_session_id or '',
+        'n': uuid.uuid4().hex,
+    })
+
+
+def read_spin_token(token: str, year: int, voter_session_id: str, image_id: int) -> dict:
+    try:
+        data = _serializer().loads(token, max_age=SPIN_TOKEN_MAX_AGE)
+    except BadSignature:
+        raise DuelRejected('Spin ungültig oder abgelaufen')
+    if data.get('y') != year or (data.get('v') and data.get('v') != voter_session_id):
+        raise DuelRejected('Spin gehört nicht zu dieser Session')
+    if image_id not in data.get('c', []):
+        raise DuelRejected('Bild war nicht Teil des Spins')
+    return data
+
+
+def _elo_update(db, year: int, winner_id: int, loser_ids: list) -> None:
+    ids = [winner_id, *loser_ids]
+    rows = db.execute(
+        f'SELECT image_id, rating FROM duel_ratings WHERE contest_year = ? AND image_id IN ({",".join("?" * len(ids))})',
+        (year, *ids)
+    ).fetchall()
+    ratings = {i: BASE_RATING for i in ids}
+    ratings.update({r['image_id']: r['rating'] for r in rows})
+
+    winner_rating = ratings[winner_id]
+    gained = 0.0
+    for loser_id in loser_ids:
+        expected = 1.0 / (1.0 + 10 ** ((ratings[loser_id] - winner_rating) / 400.0))
+        delta = ELO_K * (1.0 - expected)
+        gained += delta
+        ratings[loser_id] -= delta
+
+    now = datetime.now().isoformat()
+    upsert = '''
+        INSERT INTO duel_ratings (contest_year, image_id, rating, wins, losses, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(contest_year, image_id) DO UPDATE SET
+            rating = excluded.rating,
+            wins = wins + excluded.wins,
+            losses = losses + excluded.losses,
+            updated_at = excluded.updated_at
+    '''
+    db.execute(upsert, (year, winner_id, winner_rating + gained, len(loser_ids), 0, now))
+    db.executemany(upsert, [(year, loser_id, ratings[loser_id], 0, 1, now) for loser_id in loser_ids])
+
+
+def record_duel(db, year: int, image_id: int, voter_session_id: str, spin: dict, spin_limit: int) -> int:
+    """
+    Speichert einen Duel-Vote samt Paarungen (Sieger gegen jeden anderen
+    Kandidaten) und aktualisiert die Elo-Ratings. Läuft in der Transaktion
+    des Aufrufers (run_write), damit die Write-Queue Duelle bündeln kann.
+    Gibt die Zahl verbrauchter Spins zurück.
+    """
+    row = db.execute(
+        'SELECT spins_used FROM voter_year_stats WHERE voter_session_id = ? AND contest_year = ?',
+        (voter_session_id, year)
+    ).fetchone()
+    used = row[0] if row else 0
+    if used >= spin_limit:
+        raise DuelRejected('Keine Spins mehr übrig', 403)
+
+    spin_id = spin['n']
+    if db.execute('SELECT 1 FROM duel_votes WHERE spin_id = ?', (spin_id,)).fetchone():
+        raise DuelRejected('Dieser Spin wurde bereits gewertet', 409)
+
+    now = datetime.now().isoformat()
+    cur = db.execute(
+        'INSERT INTO duel_votes (image_id, voter_session_id, contest_year, created_at, spin_id) VALUES (?, ?, ?, ?, ?)',
+        (image_id, voter_session_id, year, now, spin_id)
+    )
+    loser_ids = [c for c in spin['c'] if c != image_id]
+    db.executemany(
+        'INSERT INTO duel_outcomes (contest_year, duel_vote_id, winner_id, loser_id, created_at) VALUES (?, ?, ?, ?, ?)',
+        [(year, cur.lastrowid, image_id, loser_id, now) for loser_id in loser_ids]
+    )
+    _elo_update(db, year, image_id, loser_ids)
+    return used + 1
+
+
+def replay_elo(db) -> int:
+    """
+    Baut duel_ratings.rating (Elo) aus duel_outcomes neu auf, Duell für Duell
+    in Eingangsreihenfolge. Läuft in der Transaktion des Aufrufers.
+    Gibt die Zahl nachgespielter Duelle zurück.
+    """
+    db.execute('DELETE FROM duel_ratings')
+    duels = {}
+    for row in db.execute(
+        'SELECT contest_year, duel_vote_id, winner_id, loser_id FROM duel_outcomes ORDER BY id'
+    ).fetchall():
+        key = (row['contest_year'], row['duel_vote_id'], row['winner_id'])
+        duels.setdefault(key, []).append(row['loser_id'])
+    for (year, _duel_vote_id, winner_id), loser_ids in duels.items():
+        _elo_update(db, year, winner_id, loser_ids)
+    return len(duels)
+
+
+def fit_bradley_terry(year: int) -> int:
+    """
+    Fittet Bradley-Terry-Stärken über alle Duelle eines Jahres und schreibt sie
+    (Elo-skaliert) nach duel_ratings.bt_rating. Die inkrementelle Elo-Spalte
+    rating bleibt unberührt, beide Skalen mischen sich nie. Die Duelle werden
+    in SQL zu Siegzählern pro Paar aggregiert; iteriert wird nur über Paare.
+    Gibt die Zahl bewerteter Bilder zurück.
+    """
+    db = get_db()
+    pairs = db.execute('''
+        SELECT winner_id, loser_id, COUNT(*) AS n
+        FROM duel_outcomes
+        WHERE contest_year = ?
+        GROUP BY winner_id, loser_id
+    ''', (year,)).fetchall()
+
+    wins = {}
+    losses = {}
+    games = {}
+    for winner_id, loser_id, n in pairs:
+        wins[winner_id] = wins.get(winner_id, 0) + n
+        losses[loser_id] = losses.get(loser_id, 0) + n
+        key = (winner_id, loser_id) if winner_id < loser_id else (loser_id, winner_id)
+        games[key] = games.get(key, 0) + n
+
+    items = sorted(set(wins) | set(losses))
+    strength = {i: 1.0 for i in items}
+    opponents = {i: [] for i in items}
+    for (a, b), n in games.items():
+        opponents[a].append((b, n))
+        opponents[b].append((a, n))
+
+    for _iteration in range(BT_MAX_ITERATIONS):
+        updated = {}
+        for i in items:
+            p_i = strength[i]
+            # Prior: BT_PRIOR Siege + BT_PRIOR Niederlagen gegen Stärke 1.0
+            denom = sum(n / (p_i + strength[j]) for j, n in opponents[i]) + 2 * BT_PRIOR / (p_i + 1.0)
+            updated[i] = (wins.get(i, 0) + BT_PRIOR) / denom
+        # Normieren: geometrisches Mittel = 1
+        log_mean = sum(math.log(v) for v in updated.values()) / len(updated) if updated else 0.0
+        scale = math.exp(log_mean)
+        change = max((abs(updated[i] / scale - strength[i]) for i in items), default=0.0)
+        strength = {i: updated[i] / scale for i in items}
+        if change < BT_TOLERANCE:
+            break
+
+    now = datetime.now().isoformat()
+    begin_immediate(db)
+    try:
+        db.execute('UPDATE duel_ratings SET bt_rating = NULL WHERE contest_year = ?', (year,))
+        db.executemany(
+            '''
+            INSERT INTO duel_ratings (contest_year, image_id, bt_rating, wins, losses, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(contest_year, image_id) DO UPDATE SET
+                bt_rating = excluded.bt_rating,
+                updated_at = excluded.updated_at
+            ''',
+            [(year, i, BASE_RATING + 400.0 * math.log10(strength[i]), wins.get(i, 0), losses.get(i, 0), now)
+             for i in items]
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(items)
+
+
+def duel_ranking(db, year: int, limit: int = 10) -> list:
+    rows = db.execute('''
+        SELECT images.id, images.filename, images.uploader, images.description,
+               r.rating, r.bt_rating, r.wins, r.losses
+        FROM duel_ratings r
+        JOIN images ON images.id = r.image_id AND images.contest_year = r.contest_year
+        WHERE r.contest_year = ? AND images.visible = 1
+        ORDER BY r.rating DESC
+        LIMIT ?
+    ''', (year, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
+@click.command('fit-duel-ratings')
+@click.option('--year', type=int, required=True, help='Wettbewerbsjahr.')
+@with_appcontext
+def fit_duel_ratings_command(year):
+    count = fit_bradley_terry(year)
+    click.echo(f'✔ Bradley-Terry-Ratings für {year} berechnet ({count} Bilder).')
@@ -0,0 +1,65 @@
+import hashlib
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+
+# Felder, die das Karten-HTML bestimmen; ändert sich eins, wird nur diese Karte neu gerendert
+CARD_FIELDS = ('id', 'filename', 'uploader', 'description', 'content_hash', 'derivatives', 'width', 'height', 'placeholder')
+
+# (year, image_id, eager) -> (fingerprint, html); pro Prozess
+_cards = {}
+# year -> ContestPage; pro Prozess
+_pages = {}
+_lock = threading.Lock()
+
+
+class ContestPage:
+    """Fertig gerenderte, voter-neutrale Galerie-Seite eines Jahres."""
+
+    def __init__(self, key: tuple, html: str):
+        self.key = key
+        self.html = html
+        self.etag = hashlib.sha256(html.encode('utf-8')).hexdigest()[:32]
+
+
+def card_fingerprint(image) -> tuple:
+    return tuple(image[field] for field in CARD_FIELDS)
+
+
+def render_cards(year: int, images: list, eager_count: int = 0) -> Markup:
+    """
+    Karten-HTML ohne Voter-Zustand (Chips/Reaktionen setzt das JS aus
+    /api/voter-state). Jede Karte wird einzeln gecacht und nur neu gerendert,
+    wenn sich ihre Bildzeile geändert hat.
+    """
+    parts = []
+    for index, image in enumerate(images):
+        eager = index < eager_count
+        key = (year, image['id'], eager)
+        fingerprint = card_fingerprint(image)
+        cached = _cards.get(key)
+        if cached is None or cached[0] != fingerprint:
+            html = render_template('_contest_card.html', image=image, year=year, eager=eager)
+            cached = (fingerprint, html)
+            with _lock:
+                _cards[key] = cached
+        parts.append(cached[1])
+    return Markup(''.join(parts))
+
+
+def get_page(year: int, key: tuple) -> ContestPage | None:
+    page = _pages.get(year)
+    if page is not None and page.key == key:
+        return page
+    return None
+
+
+def store_page(year: int, key: tuple, html: str) -> ContestPage:
+    page = ContestPage(key, html)
+    with _lock:
+        _pages[year] = page
+        # Karten gelöschter/ausgeblendeter Bilder nicht ewig halten
+        if len(_cards) > 4096:
+            _cards.clear()
+    return page
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+
+try:
+    from .db import get_read_db
+    from .snapshots import score_stamp
+except ImportError:
+    # Fallback for direct module execution
+    from db import get_read_db
+    from snapshots import score_stamp
+
+# Mindestabstand zwischen zwei Aggregationen pro Jahr (egal wie viele Admins zuschauen)
+TICK_SECONDS = 1.0
+# Kommentar-Zeile, damit Proxies die Verbindung offen lassen
+HEARTBEAT_SECONDS = 15.0
+# Danach beendet der Server den Stream, EventSource verbindet sich selbst neu
+STREAM_MAX_SECONDS = 600.0
+
+
+class ChangeHub:
+    """Prozessweiter Benachrichtigungs-Hub: vote/react melden Änderungen pro Jahr."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}
+
+    def publish(self, year: int) -> None:
+        with self._cond:
+            self._versions[year] = self._versions.get(year, 0) + 1
+            self._cond.notify_all()
+
+    def version(self, year: int) -> int:
+        return self._versions.get(year, 0)
+
+    def wait(self, year: int, seen: int, timeout: float) -> int:
+        with self._cond:
+            self._cond.wait_for(lambda: self._versions.get(year, 0) != seen, timeout=timeout)
+            return self._versions.get(year, 0)
+
+
+hub = ChangeHub()
+
+
+class LiveRanking:
+    """
+    Geteiltes Ranking eines Jahres. Höchstens eine Aggregation pro Tick;
+    alle Streams lesen dasselbe Ergebnis. Der Score-Stempel erkennt auch
+    Änderungen aus anderen Worker-Prozessen (dort feuert der Hub nicht).
+    """
+
+    def __init__(self, year: int):
+        self.year = year
+        self.lock = threading.Lock()
+        self.computed_at = 0.0
+        self.stamp = None
+        self.seq = 0
+        self.data = None
+
+    def get(self) -> tuple:
+        now = time.monotonic()
+        if self.data is not None and now - self.computed_at < TICK_SECONDS:
+            return self.seq, self.data
+        with self.lock:
+            if self.data is not None and time.monotonic() - self.computed_at < TICK_SECONDS:
+                return self.seq, self.data
+            db = get_read_db()
+            stamp = score_stamp(db, self.year)
+            if self.data is None or stamp != self.stamp:
+                self.data = _aggregate(db, self.year)
+                self.stamp = stamp
+                self.seq += 1
+            self.computed_at = time.monotonic()
+            return self.seq, self.data
+
+
+_rankings = {}
+_rankings_lock = threading.Lock()
+
+
+def live_ranking(year: int) -> LiveRanking:
+    with _rankings_lock:
+        ranking = _rankings.get(year)
+        if ranking is None:
+            ranking = _rankings[year] = LiveRanking(year)
+        return ranking
+
+
+def _aggregate(db, year: int) -> dict:
+    rows = db.execute('''
+        SELECT
+            images.id,
+            images.filename,
+            images.content_hash,
+            images.derivatives,
+            images.width,
+            images.height,
+            images.uploader,
+            images.description,
+            s.vote_count,
+            s.vote_points,
+            s.hype_count,
+            s.creative_count,
+            s.funny_count,
+            s.underrated_count,
+            s.weighted_score
+        FROM image_scores s
+        JOIN images ON images.id = s.image_id AND images.contest_year = s.contest_year
+        WHERE s.contest_year = ?
+        AND (s.vote_count > 0 OR s.hype_count + s.creative_count + s.funny_count + s.underrated_count > 0)
+        ORDER BY s.weighted_score DESC, s.vote_count DESC
+    ''', (year,)).fetchall()
+    voters = db.execute(
+        'SELECT COUNT(DISTINCT voter_session_id) FROM votes WHERE contest_year = ?',
+        (year,)
+    ).fetchone()[0]
+    ranking = [dict(r) for r in rows]
+    return {
+        'rows': {r['id']: r for r in ranking},
+        'order': [r['id'] for r in ranking],
+        'total_votes': sum(r['vote_count'] for r in ranking),
+        'voters': voters,
+    }
+
+
+def diff(previous: dict | None, current: dict) -> dict:
+    """Delta zwischen zwei Ranking-Ständen (nur geänderte Zeilen)."""
+    old_rows = previous['rows'] if previous else {}
+    return {
+        'changed': [row for image_id, row in current['rows'].items() if old_rows.get(image_id) != row],
+        'removed': [image_id for image_id in old_rows if image_id not in current['rows']],
+        'order': current['order'],
+        'total_votes': current['total_votes'],
+        'voters': current['voters'],
+    }
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f'event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'
+
+
+def stream_ranking(app, year: int):
+    """SSE-Generator: erst kompletter Stand, danach nur Deltas bei Änderungen."""
+    ranking = live_ranking(year)
+    started = time.monotonic()
+    last_beat = started
+    sent_seq, sent_data = 0, None
+    seen = hub.version(year)
+    while time.monotonic() - started < STREAM_MAX_SECONDS:
+        # DB-Verbindung nur für die Dauer eines Ticks aus dem Pool leihen
+        with app.app_context():
+            seq, data = ranking.get()
+        if seq != sent_seq:
+            yield _sse('ranking', diff(sent_data, data))
+            sent_seq, sent_data = seq, data
+            last_beat = time.monotonic()
+        elif time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+            yield ': ping\n\n'
+            last_beat = time.monotonic()
+        # Auf Hub-Signal warten (oder Tick-Timeout für Änderungen anderer Worker)
+        seen = hub.wait(year, seen, timeout=max(TICK_SECONDS, 1.0))
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+import time
+
+from flask import abort, current_app, send_file, url_for
+
+# Gehashte URLs ändern sich mit dem Inhalt -> Browser dürfen ein Jahr cachen
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 16
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+_CHUNK = 1024 * 1024
+
+# path -> (mtime_ns, size, hash); pro Prozess, neu gehasht nur wenn sich die Datei ändert
+_hashes = {}
+# Ordner -> {'stamp', 'files', 'version', 'checked'}; pro Prozess (folder_files)
+_folders = {}
+_lock = threading.Lock()
+
+
+def allowed_file(filename: str) -> bool:
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def file_hash(path: str) -> str:
+    """Gekürzter SHA-256 des Dateiinhalts (gecacht über mtime/size)."""
+    st = os.stat(path)
+    cached = _hashes.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()[:HASH_LENGTH]
+    with _lock:
+        _hashes[path] = (st.st_mtime_ns, st.st_size, value)
+    return value
+
+
+def folder_files(path: str, refresh: bool = False) -> tuple:
+    """
+    (version, {dateiname: (mtime_ns, size)}) der erlaubten Bilddateien eines Ordners.
+    Der Ordner wird höchstens alle FILE_INDEX_POLL_SECONDS per stat geprüft und
+    nur neu gelesen, wenn sich seine mtime geändert hat; version steigt nur,
+    wenn sich die Liste wirklich ändert. refresh=True nach eigenen
+    Schreibzugriffen (Überschreiben einer Datei ändert die Ordner-mtime nicht).
+    """
+    now = time.monotonic()
+    entry = _folders.get(path)
+    if entry is not None and not refresh and now - entry['checked'] < current_app.config['FILE_INDEX_POLL_SECONDS']:
+        return entry['version'], entry['files']
+
+    try:
+        st = os.stat(path)
+        stamp = (st.st_ino, st.st_mtime_ns)
+    except OSError:
+        stamp = None
+    if entry is not None and not refresh and entry['stamp'] == stamp:
+        entry['checked'] = now
+        return entry['version'], entry['files']
+
+    files = {}
+    if stamp is not None:
+        with os.scandir(path) as it:
+            for item in it:
+                if item.is_file() and allowed_file(item.name):
+                    item_stat = item.stat()
+                    files[item.name] = (item_stat.st_mtime_ns, item_stat.st_size)
+    version = 1 if entry is None else entry['version'] + (files != entry['files'])
+    with _lock:
+        _folders[path] = {'stamp': stamp, 'files': files, 'version': version, 'checked': now}
+    return version, files
+
+
+def uploads_dir(year: int) -> str:
+    # Reiner Pfad-Join ohne makedirs: Lesepfad fasst das Dateisystem nicht an
+    return os.path.join(current_app.static_folder, f'uploads_{year}')
+
+
+def stickers_path(year: int, filename: str) -> str | None:
+    """Sticker liegen in stickers_<year> oder (Altbestand) im gemeinsamen stickers-Ordner."""
+    static = current_app.static_folder
+    for folder in (os.path.join(static, f'stickers_{year}'), os.path.join(static, 'stickers')):
+        # Nur Namen aus dem Ordner-Index: kein stat pro Request, kein Pfad-Traversal
+        if filename in folder_files(folder)[1]:
+            return os.path.join(folder, filename)
+    return None
+
+
+def send_media(path: str | None, content_hash: str | None = None, verify: bool = True):
+    """
+    Liefert eine Mediendatei mit ETag (= Inhalts-Hash) und 304-Handling.
+    Stimmt der Hash aus der URL, ist die Antwort immutable für ein Jahr;
+    ungehashte oder veraltete URLs müssen jedes Mal revalidieren.
+    verify=False für Blobs (Dateiname ist der Hash) und Ableitungen (URL
+    trägt den Hash des Originals): dann wird nicht neu gehasht.
+    """
+    if not path or not os.path.isfile(path):
+        abort(404)
+    current = content_hash if content_hash is not None and not verify else file_hash(path)
+    if content_hash is not None and (not verify or content_hash == current):
+        response = send_file(path, etag=current, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response = send_file(path, etag=current, max_age=0, conditional=True)
+        response.cache_control.no_cache = True
+    return response
+
+
+def media_url(year: int, image) -> str:
+    """Gehashte URL des Originals; ohne Hash (Datei fehlte beim Backfill) die alte URL."""
+    content_hash = image['content_hash'] if 'content_hash' in image.keys() else None
+    if content_hash:
+        return url_for('main.media_hashed', year=year, content_hash=content_hash, filename=image['filename'])
+    return url_for('main.media_year', year=year, filename=image['filename'])
+
+
+def sticker_url(year: int, sticker) -> str:
+    content_hash = sticker['content_hash'] if 'content_hash' in sticker.keys() else None
+    if content_hash:
+        return url_for('main.sticker_hashed', year=year, content_hash=content_hash, filename=sticker['filename'])
+    return url_for('main.sticker_year', year=year, filename=sticker['filename'])
@@ -0,0 +1,90 @@
+import ast
+import os
+import re
+
+import click
+from flask.cli import with_appcontext
+
+try:
+    from .db import get_db
+except ImportError:
+    # Fallback for direct module execution
+    from db import get_db
+
+# Module, deren SQL-Literale geprüft werden (relativ zu app/)
+SQL_MODULES = ('routes.py', 'vote_engine.py', 'year_config.py', 'snapshots.py', 'live_results.py', 'duel_pool.py', 'duel_ratings.py',
+               'blobs.py', 'upload_jobs.py')
+
+# Tabellen, auf denen pro Request gelesen/geschrieben wird
+HOT_TABLES = {'votes', 'reactions', 'duel_votes', 'images', 'image_scores'}
+
+_SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE)\s')
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+
+
+def collect_statements(app_root: str) -> list:
+    """Alle SQL-String-Literale aus SQL_MODULES als (modul, zeile, sql)."""
+    statements = []
+    for module in SQL_MODULES:
+        path = os.path.join(app_root, module)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            tree = ast.parse(f.read(), filename=module)
+        # Teilstücke von f-Strings (dynamisches SQL) sind keine vollständigen Statements
+        fragments = {id(v) for n in ast.walk(tree) if isinstance(n, ast.JoinedStr) for v in n.values}
+        for node in ast.walk(tree):
+            if id(node) in fragments:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and _SQL_START.match(node.value):
+                statements.append((module, node.lineno, node.value))
+    return sorted(statements)
+
+
+def explain(db, sql: str) -> list:
+    params = (None,) * sql.count('?')
+    return [row[3] for row in db.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+
+def full_scans(plan: list) -> list:
+    """Plan-Zeilen, die eine Hot-Tabelle ohne Index komplett lesen."""
+    bad = []
+    for detail in plan:
+        m = _SCAN.match(detail)
+        if m and m.group(1) in HOT_TABLES and 'INDEX' not in m.group(2):
+            bad.append(detail)
+    return bad
+
+
+def check_query_plans(app_root: str) -> list:
+    """Gibt (modul, zeile, sql, scans) für jedes Statement mit Full-Scan zurück."""
+    db = get_db()
+    failures = []
+    for module, lineno, sql in collect_statements(app_root):
+        scans = full_scans(explain(db, sql))
+        if scans:
+            failures.append((module, lineno, sql, scans))
+    return failures
+
+
+@click.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Alle Pläne ausgeben, nicht nur Fehler.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    from flask import current_app
+
+    if verbose:
+        db = get_db()
+        for module, lineno, sql in collect_statements(current_app.root_path):
+            click.echo(f'{module}:{lineno}')
+            for detail in explain(db, sql):
+                click.echo(f'    {detail}')
+
+    failures = check_query_plans(current_app.root_path)
+    for module, lineno, sql, scans in failures:
+        click.echo(f'✘ {module}:{lineno} {" ".join(sql.split())[:100]}')
+        for detail in scans:
+            click.echo(f'    {detail}')
+    if failures:
+        raise SystemExit(1)
+    click.echo('✔ Keine Full-Table-Scans auf Hot-Tabellen.')
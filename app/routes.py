@@ -1,58 +1,80 @@
-﻿import json
+﻿import base64
+import binascii
+import hashlib
+import json
 import os
+import re
+import shutil
 import zipfile
 from datetime import datetime
-from flask import send_from_directory
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, current_app, jsonify, g, abort
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
 try:
-    from .db import get_db
+    from .db import begin_immediate, get_db, get_read_db, pool_stats
+    from .vote_engine import VoteEngine, VoteRejected
+    from .year_config import get_year_config, bump_config_version, config_version
+    from .snapshots import get_snapshot, store_snapshot, score_stamp
+    from .live_results import hub, stream_ranking
+    from .duel_pool import sample_candidates
+    from .duel_ratings import DuelRejected, issue_spin_token, read_spin_token, record_duel, duel_ranking
+    from .derivatives import derived_srcset, thumb_url, derived_name
+    from .blobs import blob_dir, blob_path, find_blob, release_blob, remove_blob_files
+    from .media import allowed_file, file_hash, folder_files, uploads_dir, stickers_path, send_media, media_url, sticker_url
+    from .gallery_cache import render_cards, get_page, store_page
+    from .write_queue import run_write, write_queue_stats
+    from .upload_jobs import COPY_CHUNK, start_upload_job, get_upload_job
 except ImportError:
     # Fallback for direct module execution (e.g. python app/routes.py)
-    from db import get_db
+    from db import begin_immediate, get_db, get_read_db, pool_stats
+    from vote_engine import VoteEngine, VoteRejected
+    from year_config import get_year_config, bump_config_version, config_version
+    from snapshots import get_snapshot, store_snapshot, score_stamp
+    from live_results import hub, stream_ranking
+    from duel_pool import sample_candidates
+    from duel_ratings import DuelRejected, issue_spin_token, read_spin_token, record_duel, duel_ranking
+    from derivatives import derived_srcset, thumb_url, derived_name
+    from blobs import blob_dir, blob_path, find_blob, release_blob, remove_blob_files
+    from media import allowed_file, file_hash, folder_files, uploads_dir, stickers_path, send_media, media_url, sticker_url
+    from gallery_cache import render_cards, get_page, store_page
+    from write_queue import run_write, write_queue_stats
+    from upload_jobs import COPY_CHUNK, start_upload_job, get_upload_job
 
 bp = Blueprint('main', __name__)
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+# srcset/Thumbnail-URLs der WebP/AVIF-Ableitungen in allen Templates
+bp.add_app_template_global(derived_srcset)
+bp.add_app_template_global(thumb_url)
+bp.add_app_template_global(media_url)
+bp.add_app_template_global(sticker_url)
+# Galerie: erster Bildschirm serverseitig, Rest per /api/images nachladen
+CONTEST_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 60
 
 def get_year_settings(year: int) -> dict:
-    db = get_db()
-    row = db.execute(
-        "SELECT * FROM contest_year_settings WHERE contest_year = ?",
-        (year,)
-    ).fetchone()
-    if not row:
-        # Fallback, falls Settings noch nicht existieren
-        return {"vote_mode": "toggle", "max_actions": 3, "unit_name": "Stimme", "unit_icon": "❤️"}
-    return dict(row)
+    return get_year_config(year).settings
 
 def get_vote_options(year: int) -> list[dict]:
-    db = get_db()
-    rows = db.execute("""
-        SELECT id, opt_key, label, icon, value, unique_per_user, exclusive_group, is_special, active, sort_order
-        FROM vote_options
-        WHERE contest_year = ? AND active = 1
-        ORDER BY sort_order ASC, id ASC
-    """, (year,)).fetchall()
-    return [dict(r) for r in rows]
+    return get_year_config(year).options
 
 def get_vote_option_map(year: int) -> dict:
-    opts = get_vote_options(year)
-    return {o["opt_key"]: o for o in opts}
-
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return get_year_config(year).option_map
 
 
 def _settings_path() -> str:
     return os.path.join(current_app.instance_path, 'admin_settings.json')
 
 
-def get_runtime_settings() -> dict:
+# Prozess-Cache für admin_settings.json: (inode, mtime_ns, size) -> geparste Settings.
+# Pro Request wird höchstens einmal per os.stat geprüft (Ergebnis in g), so
+# sehen alle Worker eine Änderung spätestens beim nächsten Request.
+_settings_cache = {'stamp': None, 'data': None, 'version': 0}
+
+
+def _default_runtime_settings() -> dict:
     base_year = int(current_app.config.get('CURRENT_CONTEST_YEAR', 2026))
-    defaults = {
+    return {
         'current_contest_year': base_year,
         'legacy_years': current_app.config.get('LEGACY_CONTEST_YEARS', [2025]),
         'voting_end_at': current_app.config.get('VOTING_END_AT', '2026-12-31T23:59:59'),
@@ -62,37 +84,85 @@ def get_runtime_settings() -> dict:
         # ✅ NEU: Testmodus (default aus)
         'block_public_unpublished_all_years': False,
     }
-    path = _settings_path()
-    if not os.path.exists(path):
-        return defaults
 
+
+def _settings_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # os.replace erzeugt bei jedem Speichern einen neuen Inode
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _load_runtime_settings(path: str) -> dict:
+    defaults = _default_runtime_settings()
     try:
         with open(path, 'r', encoding='utf-8') as f:
             stored = json.load(f)
             defaults.update(stored or {})
     except Exception:
-        return defaults
-
+        return _default_runtime_settings()
     return defaults
 
 
+def get_runtime_settings() -> dict:
+    cached = g.get('runtime_settings')
+    if cached is not None:
+        return dict(cached)
+
+    path = _settings_path()
+    stamp = _settings_stamp(path)
+    if stamp is None:
+        data = _default_runtime_settings()
+    elif _settings_cache['stamp'] == stamp and _settings_cache['data'] is not None:
+        data = _settings_cache['data']
+    else:
+        data = _load_runtime_settings(path)
+        _settings_cache.update(stamp=stamp, data=data, version=_settings_cache['version'] + 1)
+
+    g.runtime_settings = data
+    return dict(data)
+
+
 def save_runtime_settings(data: dict) -> None:
-    with open(_settings_path(), 'w', encoding='utf-8') as f:
+    # Atomar schreiben: tmp-Datei + os.replace, Leser sehen nie halbe JSONs
+    path = _settings_path()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    merged = _default_runtime_settings()
+    merged.update(data)
+    _settings_cache.update(stamp=_settings_stamp(path), data=merged, version=_settings_cache['version'] + 1)
+    g.runtime_settings = merged
+
+    # Gecachte Seiten (contest_year, Snapshots) hängen an config_version:
+    # Bump macht sie in allen Workern ungültig (legacy_years, Wartetexte, ...)
+    db = get_db()
+    bump_config_version(db)
+    db.commit()
 
 
 def current_year() -> int:
     return int(get_runtime_settings().get('current_contest_year', 2026))
 
-def _publish_flag_path(year: int) -> str:
-    return os.path.join(current_app.root_path, f'published_flag_{year}.txt')
-
 def is_published(year: int) -> bool:
-    path = _publish_flag_path(year)
-    if not os.path.exists(path):
-        return False
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read().strip() == '1'
+    return get_year_config(year).is_published()
+
+
+def set_published(year: int, published: bool, publish_at: str | None = None) -> None:
+    db = get_db()
+    db.execute('''
+        INSERT INTO contest_year_settings (contest_year, published, publish_at, created_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(contest_year) DO UPDATE SET published = excluded.published, publish_at = excluded.publish_at
+    ''', (year, 1 if published else 0, publish_at, datetime.now().isoformat()))
+    bump_config_version(db)
+    db.commit()
 
 
 def waiting_text_for_year(year: int, settings: dict | None = None) -> str:
@@ -131,7 +201,7 @@ def sticker_folder_for_year(year: int, create: bool = False) -> str:
         os.makedirs(preferred, exist_ok=True)
         return preferred
 
-    if os.path.isdir(preferred) and any(allowed_file(f) for f in os.listdir(preferred)):
+    if folder_files(preferred)[1]:
         return preferred
 
     legacy = os.path.join(base_static, 'stickers')
@@ -141,25 +211,51 @@ def sticker_folder_for_year(year: int, create: bool = False) -> str:
     return preferred
 
 
+# year -> (ordner, index-version) des letzten Abgleichs; pro Prozess
+_sticker_sync = {}
+# year -> (key, body, etag) der gecachten /api/stickers-Antwort; pro Prozess
+_sticker_lists = {}
+
+
 def ensure_sticker_records_for_year(year: int) -> None:
-    db = get_db()
+    """
+    Gleicht stickers mit dem Ordner ab (neue Dateien anlegen, fehlende Hashes
+    nachtragen). Läuft nur, wenn sich der Ordner-Index seit dem letzten
+    Abgleich geändert hat; sonst kein SELECT und kein Commit.
+    """
     folder = sticker_folder_for_year(year)
-    files = [f for f in os.listdir(folder) if allowed_file(f)]
-    for filename in files:
-        exists = db.execute(
-            'SELECT id FROM stickers WHERE contest_year = ? AND filename = ?',
-            (year, filename)
-        ).fetchone()
-        if not exists:
-            max_sort = db.execute(
-                'SELECT COALESCE(MAX(sort_order), 0) FROM stickers WHERE contest_year = ?',
-                (year,)
-            ).fetchone()[0]
-            db.execute(
-                'INSERT INTO stickers (contest_year, filename, sort_order, active, created_at) VALUES (?, ?, ?, 1, ?)',
-                (year, filename, max_sort + 1, datetime.now().isoformat())
-            )
-    db.commit()
+    version, files = folder_files(folder)
+    if _sticker_sync.get(year) == (folder, version):
+        return
+
+    db = get_db()
+    known = {
+        row['filename']: row
+        for row in db.execute('SELECT id, filename, content_hash FROM stickers WHERE contest_year = ?', (year,)).fetchall()
+    }
+    max_sort = db.execute(
+        'SELECT COALESCE(MAX(sort_order), 0) FROM stickers WHERE contest_year = ?',
+        (year,)
+    ).fetchone()[0]
+    inserts = []
+    updates = []
+    for filename in sorted(files):
+        exists = known.get(filename)
+        if exists is None:
+            max_sort += 1
+            inserts.append((year, filename, max_sort, datetime.now().isoformat(), file_hash(os.path.join(folder, filename))))
+        elif not exists['content_hash']:
+            updates.append((file_hash(os.path.join(folder, filename)), exists['id']))
+    if inserts or updates:
+        db.executemany(
+            'INSERT INTO stickers (contest_year, filename, sort_order, active, created_at, content_hash) VALUES (?, ?, ?, 1, ?, ?)',
+            inserts
+        )
+        db.executemany('UPDATE stickers SET content_hash = ? WHERE id = ?', updates)
+        # Sticker-Listen der anderen Worker neu aufbauen
+        bump_config_version(db)
+        db.commit()
+    _sticker_sync[year] = (folder, version)
 
 
 @bp.route('/')
@@ -167,82 +263,152 @@ def root():
     return redirect(url_for('main.contest_year', year=current_year()))
 
 
-@bp.route('/media/<int:year>/<path:filename>')
-def media_year(year: int, filename: str):
-    return send_from_directory(upload_folder_for_year(year), filename)
+# Media: Hash in der URL -> immutable; alte URLs ohne Hash revalidieren per ETag.
+# Nur Pfad-Joins + stat, kein makedirs/listdir im Request-Pfad.
+@bp.route('/media/<int:year>/<content_hash>/<filename>')
+def media_hashed(year: int, content_hash: str, filename: str):
+    blob = find_blob(content_hash)
+    if blob is not None:
+        # Blob-Name ist der Hash -> nicht neu hashen; der Dateiname in der URL ist nur Anzeige
+        return send_media(blob_path(*blob), content_hash, verify=False)
+    return send_media(safe_join(uploads_dir(year), filename), content_hash)
 
 
-@bp.route('/sticker/<int:year>/<path:filename>')
-def sticker_year(year: int, filename: str):
-    folder = sticker_folder_for_year(year)
-    return send_from_directory(folder, filename)
+@bp.route('/media/<int:year>/<filename>')
+def media_year(year: int, filename: str):
+    folder = uploads_dir(year)
+    path = os.path.join(folder, filename) if filename in folder_files(folder)[1] else None
+    if path is None:
+        # Alte URL ohne Hash: Datei liegt inzwischen im Blob-Store
+        row = get_read_db().execute(
+            '''
+            SELECT blobs.hash, blobs.format
+            FROM images
+            JOIN blobs ON blobs.hash = images.blob_hash
+            WHERE images.contest_year = ? AND images.filename = ?
+            ORDER BY images.id DESC
+            LIMIT 1
+            ''',
+            (year, filename)
+        ).fetchone()
+        path = blob_path(row['hash'], row['format']) if row else None
+    return send_media(path)
 
 
-@bp.route('/contest/<int:year>')
-def contest_year(year: int):
-    # Rule: every non-active year redirects to that year's public results
-    if year != current_year():
-        return redirect(url_for('main.public_results_year', year=year))
+@bp.route('/derived/<int:year>/<content_hash>/<filename>')
+def media_derived(year: int, content_hash: str, filename: str):
+    match = re.fullmatch(r'.+\.(\d+)\.(avif|webp)', filename)
+    blob = find_blob(content_hash)
+    if match is None or blob is None:
+        abort(404)
+    digest = blob[0]
+    path = os.path.join(blob_dir(digest), derived_name(digest, int(match.group(1)), match.group(2)))
+    return send_media(path, content_hash, verify=False)
 
-    db = get_db()
 
-    images = db.execute(
-        'SELECT * FROM images WHERE visible = 1 AND contest_year = ? ORDER BY uploaded_at DESC',
-        (year,)
-    ).fetchall()
+@bp.route('/sticker/<int:year>/<content_hash>/<filename>')
+def sticker_hashed(year: int, content_hash: str, filename: str):
+    return send_media(stickers_path(year, filename), content_hash)
 
-    voter_session_id = request.cookies.get('voter_session_id')
-    year_cfg = get_year_settings(year)
-    max_actions = int(year_cfg.get("max_actions", 4))
 
-    voted = db.execute(
-        'SELECT image_id, vote_value, vote_label, vote_option_key FROM votes WHERE voter_session_id = ? AND contest_year = ?',
-        (voter_session_id, year)
-    ).fetchall()
+@bp.route('/sticker/<int:year>/<filename>')
+def sticker_year(year: int, filename: str):
+    return send_media(stickers_path(year, filename))
 
-    voted_ids = [row['image_id'] for row in voted]
-    user_bets = {
-        str(row['image_id']): {
-            'vote_value': row['vote_value'] or 1,
-            'vote_label': row['vote_label'] or '',
-            'vote_option_key': row['vote_option_key'] or ''
-        } for row in voted
-    }
 
-    used_keys = {(row['vote_option_key'] or '').lower() for row in voted}
-    vote_mode = (year_cfg.get("vote_mode") or "toggle").strip()
+def encode_cursor(row) -> str:
+    # NULL nie als 'None' kodieren (Migration 15 setzt Altbestand auf '')
+    raw = f"{row['uploaded_at'] or ''}|{row['id']}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
 
-    if vote_mode == "unique_options":
-        used_count = max_actions if ('all_in' in used_keys) else len(used_keys)
-    else:
-        used_count = len(voted)
 
-    votes_left = max(0, max_actions - used_count)
+def decode_cursor(cursor: str) -> tuple | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        uploaded_at, image_id = raw.rsplit('|', 1)
+        return uploaded_at, int(image_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def gallery_page(db, year: int, cursor: tuple | None, limit: int) -> tuple:
+    """
+    Keyset-Pagination über (uploaded_at, id) absteigend, passend zu
+    idx_images_year_visible_uploaded (id steckt als rowid im Index).
+    Gibt (rows, next_cursor) zurück; next_cursor ist None auf der letzten Seite.
+    """
+    if cursor is None:
+        rows = db.execute(
+            'SELECT * FROM images WHERE visible = 1 AND contest_year = ? ORDER BY uploaded_at DESC, id DESC LIMIT ?',
+            (year, limit + 1)
+        ).fetchall()
+    else:
+        rows = db.execute(
+            'SELECT * FROM images WHERE visible = 1 AND contest_year = ? AND (uploaded_at, id) < (?, ?) ORDER BY uploaded_at DESC, id DESC LIMIT ?',
+            (year, cursor[0], cursor[1], limit + 1)
+        ).fetchall()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
 
 
-    user_reactions = {}
-    if voter_session_id:
-        reaction_rows = db.execute(
-            'SELECT image_id, reaction_type FROM reactions WHERE voter_session_id = ? AND contest_year = ?',
-            (voter_session_id, year)
-        ).fetchall()
-        for row in reaction_rows:
-            key = str(row['image_id'])
-            user_reactions.setdefault(key, set()).add(row['reaction_type'])
+@bp.route('/contest/<int:year>')
+def contest_year(year: int):
+    # Rule: every non-active year redirects to that year's public results
+    if year != current_year():
+        return redirect(url_for('main.public_results_year', year=year))
 
+    # Seite ist für alle Voter gleich (Chips/Reaktionen kommen aus /api/voter-state).
+    # Upload/Edit/Löschen/Ableitungen bumpen config_version -> neu rendern.
     settings = get_runtime_settings()
-    legacy_years = settings.get('legacy_years', [2025])
+    max_actions = int(get_year_settings(year).get("max_actions", 4))
+    key = (config_version(), settings.get('voting_end_at'), max_actions)
+    page = get_page(year, key)
+    if page is None:
+        images, next_cursor = gallery_page(get_read_db(), year, None, CONTEST_PAGE_SIZE)
+        html = render_template(
+            'contest_index.html',
+            # Erste Reihe sofort laden (LCP), alles darunter lazy
+            cards_html=render_cards(year, images, eager_count=3),
+            next_cursor=next_cursor,
+            max_actions=max_actions,
+            year=year,
+            legacy_years=settings.get('legacy_years', [2025]),
+            voting_end_at=settings.get('voting_end_at')
+        )
+        page = store_page(year, key, html)
+    return _snapshot_response(page.html, page.etag, 'text/html; charset=utf-8')
 
-    return render_template(
-        'contest_index.html',
-        images=images,
-        voted_ids=voted_ids,
-        votes_left=votes_left,
-        year=year,
-        legacy_years=legacy_years,
-        voting_end_at=settings.get('voting_end_at'),
-        user_reactions=user_reactions,
-        user_bets=user_bets
+
+@bp.route('/api/images/<int:year>')
+def api_images(year: int):
+    """Nächste Galerie-Seite: Metadaten + fertig gerenderte Karten für contest_index."""
+    if year != current_year() and not is_published(year):
+        return jsonify(success=False, error='Jahr nicht verfügbar'), 404
+
+    limit = min(max(request.args.get('limit', CONTEST_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = None
+    raw_cursor = (request.args.get('cursor') or '').strip()
+    if raw_cursor:
+        cursor = decode_cursor(raw_cursor)
+        if cursor is None:
+            return jsonify(success=False, error='Ungültiger Cursor'), 400
+
+    images, next_cursor = gallery_page(get_read_db(), year, cursor, limit)
+
+    return jsonify(
+        success=True,
+        next_cursor=next_cursor,
+        images=[{
+            'id': image['id'],
+            'uploader': image['uploader'] or '',
+            'description': image['description'] or '',
+            'uploaded_at': image['uploaded_at'],
+            'url': media_url(year, image),
+            'thumb': thumb_url(year, image),
+            'srcset': derived_srcset(year, image),
+        } for image in images],
+        html=render_cards(year, images)
     )
 
 
@@ -265,24 +431,23 @@ def duel_year(year: int):
     if year != current_year():
         return redirect(url_for('main.public_results_year', year=year))
 
-    db = get_db()
-    candidates = db.execute(
-        'SELECT * FROM images WHERE visible = 1 AND contest_year = ? ORDER BY RANDOM() LIMIT 3',
-        (year,)
-    ).fetchall()
+    voter_session_id = request.cookies.get('voter_session_id')
+    candidates = sample_candidates(year, 3, voter_session_id)
 
     if len(candidates) < 3:
         return redirect(url_for('main.contest_year', year=year))
 
-    return render_template('duel.html', year=year, candidates=candidates)
+    spin_token = issue_spin_token(year, [c['id'] for c in candidates], voter_session_id)
+    return render_template('duel.html', year=year, candidates=candidates, spin_token=spin_token)
 
 
 def duel_spins_used(voter_session_id: str, year: int) -> int:
-    db = get_db()
-    return db.execute(
-        'SELECT COUNT(*) FROM duel_votes WHERE voter_session_id = ? AND contest_year = ?',
+    db = get_read_db()
+    row = db.execute(
+        'SELECT spins_used FROM voter_year_stats WHERE voter_session_id = ? AND contest_year = ?',
         (voter_session_id, year)
-    ).fetchone()[0]
+    ).fetchone()
+    return row[0] if row else 0
 
 
 @bp.route('/api/duel-state/<int:year>')
@@ -303,18 +468,15 @@ def duel_spin(year: int):
         if used >= 10:
             return jsonify(success=False, error='Keine Spins mehr übrig', remaining=0), 403
 
-    db = get_db()
-    rows = db.execute(
-        'SELECT id, filename, uploader, description FROM images WHERE visible = 1 AND contest_year = ? ORDER BY RANDOM() LIMIT 3',
-        (year,)
-    ).fetchall()
+    rows = sample_candidates(year, 3, voter_session_id or None)
 
     if len(rows) < 3:
         return jsonify(success=False, error='Nicht genug Bilder für Duel-Slot'), 400
 
-    return jsonify(success=True, candidates=[{
+    return jsonify(success=True, spin_token=issue_spin_token(year, [r['id'] for r in rows], voter_session_id), candidates=[{
         'id': r['id'],
         'filename': r['filename'],
+        'thumb': thumb_url(year, r),
         'uploader': r['uploader'] or 'Unbekannt',
         'description': r['description'] or ''
     } for r in rows])
@@ -326,21 +488,24 @@ def duel_vote(image_id: int):
     voter_session_id = (payload.get('voter_session_id') or '').strip()
     contest_year = int(payload.get('contest_year', current_year()))
 
+    # Spin-Token listet alle gezeigten Kandidaten => Paarungen Sieger vs. Verlierer.
+    # Pflicht: ohne Token gäbe es einen Sieg ohne Paarungen (an Elo/BT vorbei)
+    spin_token = payload.get('spin_token')
+    spin_token = spin_token.strip() if isinstance(spin_token, str) else ''
+
     if not voter_session_id:
         return jsonify(success=False, error='Session fehlt'), 400
+    if not spin_token:
+        return jsonify(success=False, error='Spin fehlt'), 400
 
-    used = duel_spins_used(voter_session_id, contest_year)
-    if used >= 10:
-        return jsonify(success=False, error='Keine Spins mehr übrig', remaining=0), 403
-
-    db = get_db()
-    db.execute(
-        'INSERT INTO duel_votes (image_id, voter_session_id, contest_year, created_at) VALUES (?, ?, ?, ?)',
-        (image_id, voter_session_id, contest_year, datetime.now().isoformat())
-    )
-    db.commit()
+    try:
+        spin = read_spin_token(spin_token, contest_year, voter_session_id, image_id)
+        used_after = run_write(lambda db: record_duel(db, contest_year, image_id, voter_session_id, spin, spin_limit=10))
+    except DuelRejected as exc:
+        if exc.status == 403:
+            return jsonify(success=False, error=exc.message, remaining=0), 403
+        return jsonify(success=False, error=exc.message), exc.status
 
-    used_after = duel_spins_used(voter_session_id, contest_year)
     return jsonify(success=True, used=used_after, remaining=max(0, 10 - used_after))
 
 
@@ -373,94 +538,45 @@ def vote(image_id: int):
     if not vote_option_key:
         return jsonify(success=False, error='vote_option_key fehlt'), 400
 
-    db = get_db()
-
     year_cfg = get_year_settings(contest_year)
-    max_actions = int(year_cfg.get("max_actions", 4))
-
     opt_map = get_vote_option_map(contest_year)
-    opt = opt_map.get(vote_option_key)
-    if not opt:
-        return jsonify(success=False, error='Ungültige Vote-Option'), 400
-
-    vote_value = int(opt.get("value") or 1)
-    vote_label = str(opt.get("label") or vote_option_key)
-    unique_per_user = int(opt.get("unique_per_user") or 0)
-    exclusive_group = (opt.get("exclusive_group") or '').strip().lower()
-
-    # 1) Prüfen ob User schon auf dieses Bild gevotet hat (pro Bild nur 1 Vote)
-    vote_exists = db.execute(
-        'SELECT id, vote_option_key, vote_value FROM votes WHERE image_id = ? AND voter_session_id = ? AND contest_year = ?',
-        (image_id, voter_session_id, contest_year)
-    ).fetchone()
+    try:
+        result = run_write(
+            lambda db: VoteEngine(db, year_cfg, opt_map).apply(image_id, voter_session_id, contest_year, vote_option_key)
+        )
+    except VoteRejected as exc:
+        return jsonify(success=False, error=exc.message), exc.status
 
-    # 2) All-in / Exklusivlogik: "all_in" blockt alles andere (wie bisher)
-    all_in_vote = db.execute(
-        'SELECT id, image_id FROM votes WHERE voter_session_id = ? AND contest_year = ? AND vote_option_key = ?',
-        (voter_session_id, contest_year, 'all_in')
-    ).fetchone()
+    hub.publish(contest_year)
+    return jsonify(success=True, vote_count=result['vote_count'], removed_only=result['removed_only'])
 
-    # 3) Pro User/Jahr Option nur einmal (falls unique_per_user)
-    opt_in_use = None
-    if unique_per_user:
-        opt_in_use = db.execute(
-            'SELECT id, image_id FROM votes WHERE voter_session_id = ? AND contest_year = ? AND vote_option_key = ?',
-            (voter_session_id, contest_year, vote_option_key)
-        ).fetchone()
 
-    # Toggle-Behaviour (gleiches Bild + gleiche Option => entfernen)
-    if vote_exists:
-        if (vote_exists['vote_option_key'] or '') == vote_option_key:
-            db.execute('DELETE FROM votes WHERE id = ?', (vote_exists['id'],))
-            db.commit()
-        else:
-            # "Replace" auf demselben Bild: erst löschen und Client bekommt removed_only=True
-            db.execute('DELETE FROM votes WHERE id = ?', (vote_exists['id'],))
-            db.commit()
-
-            updated_vote_count = db.execute(
-                'SELECT COUNT(*) FROM votes WHERE voter_session_id = ? AND contest_year = ?',
-                (voter_session_id, contest_year)
-            ).fetchone()[0]
-            return jsonify(success=True, vote_count=updated_vote_count, removed_only=True)
+@bp.route('/api/ballot/<int:year>', methods=['POST'])
+def submit_ballot(year: int):
+    """Kompletten Ballot ({image_id, vote_option_key}-Liste) in einer Transaktion ersetzen."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(success=False, error='JSON-Objekt erwartet'), 400
+    voter_session_id = payload.get('voter_session_id')
+    voter_session_id = voter_session_id.strip() if isinstance(voter_session_id, str) else ''
+    placements = payload.get('placements')
 
-    else:
-        # Block: Option bereits woanders verwendet?
-        if opt_in_use:
-            return jsonify(success=False, error=f'Option {vote_label} wurde bereits benutzt'), 403
-
-        # Block: all_in Regeln
-        if vote_option_key == 'all_in' or exclusive_group == 'allin':
-            other_votes = db.execute(
-                'SELECT COUNT(*) FROM votes WHERE voter_session_id = ? AND contest_year = ?',
-                (voter_session_id, contest_year)
-            ).fetchone()[0]
-            if other_votes > 0:
-                return jsonify(success=False, error='All-in geht nur, wenn keine anderen Optionen gesetzt sind'), 403
-        else:
-            if all_in_vote:
-                return jsonify(success=False, error='All-in ist bereits gesetzt. Erst All-in entfernen.'), 403
-
-        # Limit pro User/Jahr (max_actions)
-        vote_count = db.execute(
-            'SELECT COUNT(*) FROM votes WHERE voter_session_id = ? AND contest_year = ?',
-            (voter_session_id, contest_year)
-        ).fetchone()[0]
-        if vote_count >= max_actions:
-            return jsonify(success=False, error=f'Du hast das Limit ({max_actions}) erreicht'), 403
+    if not voter_session_id:
+        return jsonify(success=False, error='Session fehlt'), 400
+    if not isinstance(placements, list):
+        return jsonify(success=False, error='placements fehlt'), 400
 
-        db.execute(
-            'INSERT INTO votes (image_id, voter_session_id, contest_year, vote_option_key, vote_value, vote_label) VALUES (?, ?, ?, ?, ?, ?)',
-            (image_id, voter_session_id, contest_year, vote_option_key, vote_value, vote_label)
+    year_cfg = get_year_settings(year)
+    opt_map = get_vote_option_map(year)
+    try:
+        result = run_write(
+            lambda db: VoteEngine(db, year_cfg, opt_map).replace_ballot(voter_session_id, year, placements)
         )
-        db.commit()
+    except VoteRejected as exc:
+        return jsonify(success=False, error=exc.message), exc.status
 
-    updated_vote_count = db.execute(
-        'SELECT COUNT(*) FROM votes WHERE voter_session_id = ? AND contest_year = ?',
-        (voter_session_id, contest_year)
-    ).fetchone()[0]
-
-    return jsonify(success=True, vote_count=updated_vote_count)
+    hub.publish(year)
+    return jsonify(success=True, vote_count=result['vote_count'])
 
 
 @bp.route('/api/voter-state/<int:year>')
@@ -472,9 +588,10 @@ def voter_state(year: int):
     vote_mode = (year_cfg.get("vote_mode") or "toggle").strip()
 
     if not voter_session_id:
-        return jsonify(voted_ids=[], vote_count=0, votes_left=max_actions, bets=[])
+        return jsonify(voted_ids=[], vote_count=0, votes_left=max_actions, bets=[], reactions={},
+                       vote_mode=vote_mode, max_actions=max_actions)
 
-    db = get_db()
+    db = get_read_db()
     voted = db.execute(
         'SELECT image_id, vote_option_key, vote_label, vote_value FROM votes WHERE voter_session_id = ? AND contest_year = ?',
         (voter_session_id, year)
@@ -499,11 +616,20 @@ def voter_state(year: int):
 
     votes_left = max(0, max_actions - used_count)
 
+    # Reaktionen pro Bild (die Galerie-Seite selbst ist voter-neutral gecacht)
+    reactions = {}
+    for row in db.execute(
+        'SELECT image_id, reaction_type FROM reactions WHERE voter_session_id = ? AND contest_year = ?',
+        (voter_session_id, year)
+    ).fetchall():
+        reactions.setdefault(str(row['image_id']), []).append(row['reaction_type'])
+
     return jsonify(
         voted_ids=voted_ids,
         vote_count=vote_count,
         votes_left=votes_left,
         bets=bets,
+        reactions=reactions,
         vote_mode=vote_mode,
         max_actions=max_actions
     )
@@ -537,6 +663,7 @@ def admin_vote_options():
                 active_val = 1 if request.form.get(f'active_{r["id"]}') else 0
                 db.execute('UPDATE vote_options SET active = ? WHERE id = ?', (active_val, r['id']))
 
+            bump_config_version(db)
             db.commit()
             return redirect(url_for('main.admin_vote_options', year=year))
 
@@ -573,6 +700,7 @@ def admin_vote_options():
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (year, opt_key, label, icon, value, unique_per_user, exclusive_group, is_special, active, max_sort + 1, datetime.now().isoformat()))
 
+            bump_config_version(db)
             db.commit()
             return redirect(url_for('main.admin_vote_options', year=year))
 
@@ -580,6 +708,7 @@ def admin_vote_options():
             opt_id = int(request.form.get('id', 0) or 0)
             if opt_id > 0:
                 db.execute('DELETE FROM vote_options WHERE id = ? AND contest_year = ?', (opt_id, year))
+                bump_config_version(db)
                 db.commit()
             return redirect(url_for('main.admin_vote_options', year=year))
 
@@ -619,6 +748,7 @@ def reset_votes(year: int):
     db = get_db()
     db.execute('DELETE FROM votes WHERE voter_session_id = ? AND contest_year = ?', (voter_session_id, year))
     db.commit()
+    hub.publish(year)
     return jsonify(success=True)
 
 
@@ -636,7 +766,14 @@ def react(image_id):
     if not voter_session_id:
         return jsonify(success=False, error='Session fehlt'), 400
 
-    db = get_db()
+    active, count = run_write(lambda db: toggle_reaction(db, image_id, voter_session_id, reaction_type, contest_year))
+    hub.publish(contest_year)
+
+    return jsonify(success=True, active=active, count=count, reaction_type=reaction_type)
+
+
+def toggle_reaction(db, image_id: int, voter_session_id: str, reaction_type: str, contest_year: int) -> tuple:
+    """Reaktion an/aus; läuft in der Transaktion von run_write. Gibt (active, count) zurück."""
     exists = db.execute(
         'SELECT id FROM reactions WHERE image_id = ? AND voter_session_id = ? AND reaction_type = ? AND contest_year = ?',
         (image_id, voter_session_id, reaction_type, contest_year)
@@ -652,14 +789,37 @@ def react(image_id):
         )
         active = True
 
-    db.commit()
-
-    count = db.execute(
-        'SELECT COUNT(*) FROM reactions WHERE image_id = ? AND contest_year = ? AND reaction_type = ?',
-        (image_id, contest_year, reaction_type)
-    ).fetchone()[0]
-
-    return jsonify(success=True, active=active, count=count, reaction_type=reaction_type)
+    # Zähler pflegen die image_scores-Trigger im selben Commit (count ± 1), kein COUNT(*)
+    row = db.execute('''
+        SELECT CASE ?
+            WHEN 'hype' THEN hype_count
+            WHEN 'creative' THEN creative_count
+            WHEN 'funny' THEN funny_count
+            ELSE underrated_count
+        END
+        FROM image_scores WHERE contest_year = ? AND image_id = ?
+    ''', (reaction_type, contest_year, image_id)).fetchone()
+    return active, (row[0] if row else 0)
+
+
+@bp.route('/api/reaction-counts/<int:year>')
+def reaction_counts(year: int):
+    """Alle Reaktionszähler eines Jahres in einer Antwort (statt N Einzelabfragen)."""
+    rows = get_read_db().execute('''
+        SELECT s.image_id, s.hype_count, s.creative_count, s.funny_count, s.underrated_count
+        FROM image_scores s
+        JOIN images ON images.id = s.image_id
+        WHERE s.contest_year = ? AND images.visible = 1
+        AND s.hype_count + s.creative_count + s.funny_count + s.underrated_count > 0
+    ''', (year,)).fetchall()
+    return jsonify({
+        str(r['image_id']): {
+            'hype': r['hype_count'],
+            'creative': r['creative_count'],
+            'funny': r['funny_count'],
+            'underrated': r['underrated_count'],
+        } for r in rows
+    })
 
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -683,22 +843,13 @@ def upload():
         return redirect(url_for('main.login'))
 
     db = get_db()
-    year = int(request.args.get('year', request.form.get('contest_year', current_year())))
-
-    if request.method == 'POST' and 'files' in request.files:
-        files = request.files.getlist('files')
+    # Jahr nur aus der URL: request.form würde den Upload-Body vor dem Streaming-Parser einlesen
+    year = int(request.args.get('year', current_year()))
 
-        target_upload_folder = upload_folder_for_year(year)
-        for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(target_upload_folder, filename))
-                db.execute(
-                    'INSERT INTO images (filename, uploaded_at, visible, contest_year) VALUES (?, ?, ?, ?)',
-                    (filename, datetime.now().isoformat(), 1, year)
-                )
-        db.commit()
-        return redirect(url_for('main.upload', year=year))
+    if request.method == 'POST':
+        # Fallback ohne JS: Job starten, die Seite pollt dann den Fortschritt
+        job_id = start_upload_job(year)
+        return redirect(url_for('main.upload', year=year, job=job_id))
 
     images = db.execute(
         'SELECT * FROM images WHERE contest_year = ? ORDER BY uploaded_at DESC',
@@ -716,10 +867,31 @@ def upload():
         images=images,
         current_year=current_year(),
         year=year,
-        available_years=available_years
+        available_years=available_years,
+        job_id=request.args.get('job')
     )
 
 
+@bp.route('/admin/upload-jobs/<int:year>', methods=['POST'])
+def create_upload_job(year: int):
+    if not session.get('admin'):
+        # XHR/fetch-Aufrufer: JSON statt Login-Redirect (HTML)
+        return jsonify(success=False, error='Nicht angemeldet'), 401
+    job_id = start_upload_job(year)
+    return jsonify(success=True, job_id=job_id, progress_url=url_for('main.upload_job_progress', job_id=job_id)), 202
+
+
+@bp.route('/admin/upload-jobs/<job_id>')
+def upload_job_progress(job_id: str):
+    if not session.get('admin'):
+        # XHR/fetch-Aufrufer: JSON statt Login-Redirect (HTML)
+        return jsonify(success=False, error='Nicht angemeldet'), 401
+    job = get_upload_job(job_id)
+    if job is None:
+        return jsonify(success=False, error='Job nicht gefunden'), 404
+    return jsonify(job)
+
+
 
 @bp.route('/admin/settings', methods=['GET', 'POST'])
 def admin_settings():
@@ -762,6 +934,11 @@ def admin_settings():
         }
         save_runtime_settings(new_settings)
 
+        # Geplante Veröffentlichung folgt dem Voting-Ende
+        year_config = get_year_config(selected_year)
+        if year_config.publish_at is not None and not year_config.published:
+            set_published(selected_year, False, voting_end_at)
+
         # Ensure year folders exist
         upload_folder_for_year(selected_year)
         sticker_folder_for_year(selected_year, create=True)
@@ -794,6 +971,8 @@ def admin_stickers():
                 if file and allowed_file(file.filename):
                     filename = secure_filename(file.filename)
                     file.save(os.path.join(folder, filename))
+                    # Hash neu berechnen lassen (ensure_sticker_records_for_year)
+                    db.execute('UPDATE stickers SET content_hash = NULL WHERE contest_year = ? AND filename = ?', (year, filename))
 
         elif action == 'upload_zip':
             zip_file = request.files.get('zip_file')
@@ -806,8 +985,10 @@ def admin_stickers():
                         if not entry_name or not allowed_file(entry_name):
                             continue
                         safe_name = secure_filename(entry_name)
+                        # Gestreamt in festen Blöcken statt das ganze Member in den Speicher zu lesen
                         with zf.open(entry) as src, open(os.path.join(folder, safe_name), 'wb') as dst:
-                            dst.write(src.read())
+                            shutil.copyfileobj(src, dst, COPY_CHUNK)
+                        db.execute('UPDATE stickers SET content_hash = NULL WHERE contest_year = ? AND filename = ?', (year, safe_name))
 
         elif action == 'save_order':
             order_csv = request.form.get('order', '')
@@ -834,6 +1015,11 @@ def admin_stickers():
                 db.execute('DELETE FROM stickers WHERE id = ?', (sticker_id,))
                 db.commit()
 
+        # Eigene Schreibzugriffe sofort sehen; Sticker-Listen aller Worker verwerfen
+        folder_files(folder, refresh=True)
+        _sticker_sync.pop(year, None)
+        bump_config_version(db)
+        db.commit()
         ensure_sticker_records_for_year(year)
         return redirect(url_for('main.admin_stickers', year=year))
 
@@ -869,6 +1055,8 @@ def update_images():
             (uploader, description, visible, image_id)
         )
 
+    # Sichtbarkeit/Texte ändern die öffentlichen Snapshots
+    bump_config_version(db)
     db.commit()
     return redirect(url_for('main.upload', year=year))
 
@@ -879,15 +1067,34 @@ def delete_image(image_id):
         return redirect(url_for('main.login'))
 
     db = get_db()
-    image = db.execute('SELECT filename, contest_year FROM images WHERE id = ?', (image_id,)).fetchone()
-    if image:
-        image_path = os.path.join(upload_folder_for_year(int(image['contest_year'] or current_year())), image['filename'])
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    begin_immediate(db)
+    image = db.execute('SELECT filename, contest_year, blob_hash FROM images WHERE id = ?', (image_id,)).fetchone()
+    if image is None:
+        db.rollback()
+        return redirect(url_for('main.upload'))
 
+    try:
         db.execute('DELETE FROM images WHERE id = ?', (image_id,))
         db.execute('DELETE FROM votes WHERE image_id = ?', (image_id,))
+        released = []
+        if image['blob_hash']:
+            # Blob + Ableitungen nur löschen, wenn kein anderes Bild (auch anderes Jahr) ihn nutzt
+            released = release_blob(db, image['blob_hash'])
+        bump_config_version(db)
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Dateien erst nach erfolgreichem Commit entfernen
+    if image['blob_hash'] is None:
+        # Altbestand ohne Blob (Datei fehlte bei der Migration)
+        image_path = os.path.join(upload_folder_for_year(int(image['contest_year'] or current_year())), image['filename'])
+        if os.path.exists(image_path):
+            os.remove(image_path)
+    else:
+        remove_blob_files(db, image['blob_hash'], released)
+    hub.publish(int(image['contest_year'] or current_year()))
 
     return redirect(url_for('main.upload'))
 
@@ -898,35 +1105,32 @@ def results():
         return redirect(url_for('main.login'))
 
     year = int(request.args.get('year', current_year()))
-    db = get_db()
+    db = get_read_db()
 
     top_images = db.execute('''
         SELECT
             images.id,
             images.filename,
+            images.content_hash,
+            images.derivatives,
+            images.width,
+            images.height,
+            images.placeholder,
             images.uploader,
             images.description,
             images.contest_year,
-            COUNT(votes.id) as vote_count,
-            COALESCE(SUM(votes.vote_value), 0) as vote_points,
-            SUM(CASE WHEN reactions.reaction_type = 'hype' THEN 1 ELSE 0 END) as hype_count,
-            SUM(CASE WHEN reactions.reaction_type = 'creative' THEN 1 ELSE 0 END) as creative_count,
-            SUM(CASE WHEN reactions.reaction_type = 'funny' THEN 1 ELSE 0 END) as funny_count,
-            SUM(CASE WHEN reactions.reaction_type = 'underrated' THEN 1 ELSE 0 END) as underrated_count,
-            (COALESCE(SUM(votes.vote_value), 0)
-            + SUM(CASE WHEN reactions.reaction_type = 'hype' THEN 1 ELSE 0 END) * 2
-            + SUM(CASE WHEN reactions.reaction_type = 'creative' THEN 1 ELSE 0 END) * 2
-            + SUM(CASE WHEN reactions.reaction_type = 'funny' THEN 1 ELSE 0 END) * 1
-            + SUM(CASE WHEN reactions.reaction_type = 'underrated' THEN 1 ELSE 0 END) * 1) as weighted_score
-        FROM images
-        LEFT JOIN votes
-        ON images.id = votes.image_id AND votes.contest_year = images.contest_year
-        LEFT JOIN reactions
-        ON images.id = reactions.image_id AND reactions.contest_year = images.contest_year
-        WHERE images.contest_year = ?
-        AND (votes.id IS NOT NULL OR reactions.id IS NOT NULL)
-        GROUP BY images.id
-        ORDER BY weighted_score DESC, vote_count DESC
+            s.vote_count,
+            s.vote_points,
+            s.hype_count,
+            s.creative_count,
+            s.funny_count,
+            s.underrated_count,
+            s.weighted_score
+        FROM image_scores s
+        JOIN images ON images.id = s.image_id AND images.contest_year = s.contest_year
+        WHERE s.contest_year = ?
+        AND (s.vote_count > 0 OR s.hype_count + s.creative_count + s.funny_count + s.underrated_count > 0)
+        ORDER BY s.weighted_score DESC, s.vote_count DESC
     ''', (year,)).fetchall()
 
     total_votes = db.execute(
@@ -944,15 +1148,17 @@ def results():
         reverse=True
     )
 
-    published = is_published(year)
-
+    year_config = get_year_config(year)
+    published = year_config.is_published()
 
     return render_template(
         'results.html',
         top_images=top_images,
+        duel_top=duel_ranking(db, year),
         voters=voters,
         total_votes=total_votes,
         published=published,
+        publish_at=year_config.publish_at,
         show_stats=True,
         current_year=current_year(),
         year=year,
@@ -961,6 +1167,18 @@ def results():
 
 
 
+@bp.route('/admin/results/stream/<int:year>')
+def results_stream(year: int):
+    if not session.get('admin'):
+        return redirect(url_for('main.login'))
+
+    app = current_app._get_current_object()
+    response = current_app.response_class(stream_ranking(app, year), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @bp.route('/public-results')
 def public_results():
     # Default should always point to current contest year's public results
@@ -983,61 +1201,115 @@ def public_results_year(year: int):
             waiting_text=waiting_text_for_year(year, settings)
         )
 
-    db = get_db()
+    # Veröffentlicht + Voting vorbei => eingefrorener Snapshot statt Neu-Rendern
+    if results_frozen(year, settings):
+        snap = public_results_snapshot(year)
+        return _snapshot_response(snap.html, snap.etag, 'text/html; charset=utf-8')
+
+    html, _payload = render_public_results(year)
+    return html
+
+
+@bp.route('/api/public-results/<int:year>')
+def public_results_json(year: int):
+    settings = get_runtime_settings()
+    if not results_frozen(year, settings):
+        return jsonify(success=False, error='Ergebnisse noch nicht freigegeben'), 403
+    snap = public_results_snapshot(year)
+    return _snapshot_response(snap.payload_json, snap.payload_etag, 'application/json')
+
+
+def results_frozen(year: int, settings: dict | None = None) -> bool:
+    """Ergebnisse veröffentlicht und Voting beendet (Vorjahr oder voting_end_at erreicht)."""
+    if not is_published(year):
+        return False
+    cfg = settings or get_runtime_settings()
+    if year != int(cfg.get('current_contest_year', 2026)):
+        return True
+    try:
+        return datetime.now() >= datetime.fromisoformat(str(cfg.get('voting_end_at')))
+    except ValueError:
+        return False
+
+
+def public_results_snapshot(year: int):
+    stamp = (config_version(), score_stamp(get_read_db(), year))
+    snap = get_snapshot(year, stamp)
+    if snap is None:
+        html, payload = render_public_results(year)
+        snap = store_snapshot(year, stamp, html, payload)
+    return snap
+
+
+def _snapshot_response(body: str, etag: str, mimetype: str):
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=60, must-revalidate'
+    return response.make_conditional(request)
+
+
+_template_names = None
+
+
+def public_results_template(year: int) -> str | None:
+    global _template_names
+    if _template_names is None:
+        # Templates ändern sich zur Laufzeit nicht -> einmal pro Prozess listen
+        _template_names = set(current_app.jinja_env.list_templates())
+
+    year_template_name = f'public_results_{year}.html'
+    if year_template_name in _template_names:
+        return year_template_name
+
+    current_template_name = f'public_results_{current_year()}.html'
+    if current_template_name in _template_names:
+        return current_template_name
+
+    # Last-resort fallback to any yearly public results template
+    candidates = sorted(
+        f for f in _template_names if f.startswith('public_results_') and f.endswith('.html')
+    )
+    return candidates[-1] if candidates else None
+
+
+def render_public_results(year: int) -> tuple:
+    """Rendert die öffentliche Ergebnisseite; gibt (html, ranking_images_json) zurück."""
+    db = get_read_db()
 
     ranking_rows = db.execute('''
         SELECT
             images.id,
             images.filename,
+            images.content_hash,
+            images.derivatives,
+            images.width,
+            images.height,
+            images.placeholder,
             images.uploader,
             images.description,
-            COUNT(votes.id) as vote_count,
-            COALESCE(SUM(votes.vote_value), 0) as vote_points,
-            SUM(CASE WHEN reactions.reaction_type = 'hype' THEN 1 ELSE 0 END) as hype_count,
-            SUM(CASE WHEN reactions.reaction_type = 'creative' THEN 1 ELSE 0 END) as creative_count,
-            SUM(CASE WHEN reactions.reaction_type = 'funny' THEN 1 ELSE 0 END) as funny_count,
-            SUM(CASE WHEN reactions.reaction_type = 'underrated' THEN 1 ELSE 0 END) as underrated_count,
-            (COALESCE(SUM(votes.vote_value), 0)
-             + SUM(CASE WHEN reactions.reaction_type = 'hype' THEN 1 ELSE 0 END) * 2
-             + SUM(CASE WHEN reactions.reaction_type = 'creative' THEN 1 ELSE 0 END) * 2
-             + SUM(CASE WHEN reactions.reaction_type = 'funny' THEN 1 ELSE 0 END) * 1
-             + SUM(CASE WHEN reactions.reaction_type = 'underrated' THEN 1 ELSE 0 END) * 1) as weighted_score
-        FROM images
-        LEFT JOIN votes ON images.id = votes.image_id AND votes.contest_year = images.contest_year
-        LEFT JOIN reactions ON images.id = reactions.image_id AND reactions.contest_year = images.contest_year
-        WHERE images.visible = 1 AND images.contest_year = ?
-        GROUP BY images.id
-        ORDER BY weighted_score DESC, vote_count DESC
+            s.vote_count,
+            s.vote_points,
+            s.hype_count,
+            s.creative_count,
+            s.funny_count,
+            s.underrated_count,
+            s.weighted_score
+        FROM image_scores s
+        JOIN images ON images.id = s.image_id AND images.contest_year = s.contest_year
+        WHERE images.visible = 1 AND s.contest_year = ?
+        ORDER BY s.weighted_score DESC, s.vote_count DESC
     ''', (year,)).fetchall()
 
     top_images = ranking_rows[:5]
     top_10_images = ranking_rows[:10]
-    top_images_json = [dict(r) for r in top_images]
-    ranking_images_json = [dict(r) for r in ranking_rows]
+    top_images_json = [dict(r, url=media_url(year, r), thumb=thumb_url(year, r)) for r in top_images]
+    ranking_images_json = [dict(r, url=media_url(year, r), thumb=thumb_url(year, r)) for r in ranking_rows]
 
-    templates_dir = os.path.join(current_app.root_path, 'templates')
-    year_template_name = f'public_results_{year}.html'
-    year_template_path = os.path.join(templates_dir, year_template_name)
-
-    if os.path.exists(year_template_path):
-        template = year_template_name
-    else:
-        current_template_name = f'public_results_{current_year()}.html'
-        current_template_path = os.path.join(templates_dir, current_template_name)
-        if os.path.exists(current_template_path):
-            template = current_template_name
-        else:
-            # Last-resort fallback to any yearly public results template
-            if not os.path.isdir(templates_dir):
-                return ('Templates directory missing', 500)
-            candidates = sorted(
-                [f for f in os.listdir(templates_dir) if f.startswith('public_results_') and f.endswith('.html')]
-            )
-            if not candidates:
-                return ('No public results template found', 500)
-            template = candidates[-1]
+    template = public_results_template(year)
+    if template is None:
+        abort(500, 'No public results template found')
 
-    return render_template(
+    html = render_template(
         template,
         top_images=top_images,
         top_10_images=top_10_images,
@@ -1045,6 +1317,7 @@ def public_results_year(year: int):
         ranking_images_json=ranking_images_json,
         year=year
     )
+    return html, ranking_images_json
 
 
 @bp.route('/toggle-publish', methods=['POST'])
@@ -1055,7 +1328,15 @@ def toggle_publish():
     year = int(request.form.get('year', current_year()))
     action = request.form.get('action')
 
-    set_published(year, action == 'show')
+    if action == 'schedule':
+        # Automatisch zum Voting-Ende veröffentlichen
+        set_published(year, False, get_runtime_settings().get('voting_end_at'))
+    else:
+        set_published(year, action == 'show')
+
+    # Snapshot direkt beim Veröffentlichen rendern (nicht erst beim ersten Besucher)
+    if results_frozen(year):
+        public_results_snapshot(year)
     return redirect(url_for('main.results', year=year))
 
 
@@ -1074,11 +1355,21 @@ def reset_year_votes_admin():
     db.execute('DELETE FROM votes WHERE contest_year = ?', (year,))
     db.execute('DELETE FROM reactions WHERE contest_year = ?', (year,))
     db.execute('DELETE FROM duel_votes WHERE contest_year = ?', (year,))
+    db.execute('DELETE FROM duel_outcomes WHERE contest_year = ?', (year,))
+    db.execute('DELETE FROM duel_ratings WHERE contest_year = ?', (year,))
     db.commit()
+    hub.publish(year)
 
     return redirect(url_for('main.results'))
 
 
+@bp.route('/admin/db-stats')
+def admin_db_stats():
+    if not session.get('admin'):
+        return redirect(url_for('main.login'))
+    return jsonify({**pool_stats(), 'write_queue': write_queue_stats()})
+
+
 @bp.route('/api/stickers')
 def list_stickers():
     # Backward compatible default for current year
@@ -1087,13 +1378,20 @@ def list_stickers():
 
 @bp.route('/api/stickers/<int:year>')
 def list_stickers_for_year(year: int):
-    db = get_db()
     ensure_sticker_records_for_year(year)
 
-    rows = db.execute(
-        'SELECT filename FROM stickers WHERE contest_year = ? AND active = 1 ORDER BY sort_order ASC, id ASC',
-        (year,)
-    ).fetchall()
-    return jsonify([r['filename'] for r in rows])
+    # Gültig bis sich der Ordner-Index oder (Admin-Änderung) config_version ändert
+    key = (_sticker_sync.get(year), config_version())
+    cached = _sticker_lists.get(year)
+    if cached is None or cached[0] != key:
+        rows = get_read_db().execute(
+            'SELECT filename, content_hash FROM stickers WHERE contest_year = ? AND active = 1 ORDER BY sort_order ASC, id ASC',
+            (year,)
+        ).fetchall()
+        # Fertige (gehashte) URLs statt Dateinamen
+        body = json.dumps([sticker_url(year, r) for r in rows])
+        cached = (key, body, hashlib.sha256(body.encode('utf-8')).hexdigest()[:32])
+        _sticker_lists[year] = cached
+    return _snapshot_response(cached[1], cached[2], 'application/json')
 
 
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import threading
+
+# year -> PublicSnapshot; gilt pro Prozess. Ein Snapshot ist an den Stand
+# (config_version, Score-Stempel) gebunden, unter dem er gerendert wurde:
+# Unpublish/Bild-Edits bumpen config_version, Score-Änderungen ändern den
+# Stempel; beides macht den alten Snapshot in allen Workern ungültig.
+_snapshots = {}
+_lock = threading.Lock()
+
+
+class PublicSnapshot:
+    """Fertig gerenderte öffentliche Ergebnisseite eines abgeschlossenen Jahres."""
+
+    def __init__(self, year: int, stamp: tuple, html: str, payload: list):
+        self.year = year
+        self.stamp = stamp
+        self.html = html
+        self.payload = payload
+        self.payload_json = json.dumps(payload, ensure_ascii=False)
+        self.etag = _content_hash(html)
+        self.payload_etag = _content_hash(self.payload_json)
+
+
+def _content_hash(body: str) -> str:
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+def score_stamp(db, year: int) -> tuple:
+    """
+    Stand der Scores eines Jahres: Änderungszähler aus score_versions (PK-Lookup),
+    den die Trigger auf image_scores bei jeder Änderung hochzählen, auch bei Tausch.
+    """
+    row = db.execute('SELECT version FROM score_versions WHERE contest_year = ?', (year,)).fetchone()
+    return (row['version'] if row is not None else 0,)
+
+
+def get_snapshot(year: int, stamp: tuple):
+    snap = _snapshots.get(year)
+    if snap is not None and snap.stamp == stamp:
+        return snap
+    return None
+
+
+def store_snapshot(year: int, stamp: tuple, html: str, payload: list) -> PublicSnapshot:
+    snap = PublicSnapshot(year, stamp, html, payload)
+    with _lock:
+        _snapshots[year] = snap
+    return snap
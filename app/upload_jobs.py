@@ -0,0 +1,416 @@
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+from PIL import Image
+from werkzeug.formparser import FormDataParser
+from werkzeug.utils import secure_filename
+
+try:
+    from .blobs import blob_path, sha256_file, store_blob
+    from .db import get_db, begin_immediate
+    from .derivatives import image_metadata, process_pool, schedule_derivatives, store_derivatives
+    from .media import HASH_LENGTH, allowed_file
+    from .year_config import bump_config_version
+except ImportError:
+    # Fallback for direct module execution
+    from blobs import blob_path, sha256_file, store_blob
+    from db import get_db, begin_immediate
+    from derivatives import image_metadata, process_pool, schedule_derivatives, store_derivatives
+    from media import HASH_LENGTH, allowed_file
+    from year_config import bump_config_version
+
+# Fortschritt höchstens so oft in upload_jobs schreiben (Sekunden)
+PROGRESS_INTERVAL = 0.5
+# Abgeschlossene Jobs so lange für das Polling aufheben
+JOB_RETENTION = timedelta(days=7)
+# Ohne Lebenszeichen so lange gilt ein 'running'-Job als tot (Worker abgestürzt/neu gestartet)
+JOB_STALE_AFTER = timedelta(minutes=15)
+# Kopieren/Entpacken in festen Blöcken (Zip-Member nie komplett im Speicher)
+COPY_CHUNK = 1024 * 1024
+
+
+def inspect_upload(path: str) -> dict:
+    """
+    Läuft im Worker-Prozess: SHA-256, Magic-Byte-Prüfung und Metadaten
+    (Format, Abmessungen, Orientation, LQIP) einer gespoolten Datei.
+    Wirft ValueError, wenn die Datei kein gültiges Bild ist.
+    """
+    digest, kind = sha256_file(path)
+    if kind is None:
+        raise ValueError('kein PNG/JPEG/GIF/WebP')
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        meta = image_metadata(path)
+    except Exception as exc:
+        raise ValueError(f'Bild nicht lesbar ({exc})')
+    return {'sha256': digest, 'format': kind, **meta}
+
+
+class _Spool:
+    """stream_factory für den Multipart-Parser: jede Datei geht chunkweise direkt auf die Platte."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.count = 0
+
+    def __call__(self, total_content_length, content_type, filename, content_length=None):
+        self.count += 1
+        return open(os.path.join(self.folder, f'{self.count:05d}.part'), 'wb+')
+
+
+def start_upload_job(year: int) -> str:
+    """
+    Liest den Multipart-Body des aktuellen Requests gestreamt in einen
+    Spool-Ordner und startet die Verarbeitung im Hintergrund. Der Request
+    wartet nur auf den Body, nicht auf Hashing/Prüfung/Insert.
+    request.form/request.files dürfen vorher nicht angefasst werden.
+    """
+    job_id = uuid.uuid4().hex
+    spool_dir = os.path.join(current_app.instance_path, 'upload_spool', job_id)
+    os.makedirs(spool_dir)
+
+    parser = FormDataParser(
+        stream_factory=_Spool(spool_dir),
+        max_form_memory_size=request.max_form_memory_size,
+        max_content_length=request.max_content_length,
+        max_form_parts=request.max_form_parts,
+    )
+    _stream, _form, files = parser.parse(request.stream, request.mimetype, request.content_length,
+                                         request.mimetype_params)
+
+    entries = []
+    errors = []
+    for file in files.getlist('files'):
+        file.stream.close()
+        filename = secure_filename(file.filename or '')
+        if filename and allowed_file(filename):
+            entries.append((file.stream.name, filename))
+        else:
+            os.remove(file.stream.name)
+            errors.append(f'{file.filename or "?"}: Dateityp nicht erlaubt')
+
+    db = get_db()
+    now = datetime.now()
+    db.execute('DELETE FROM upload_jobs WHERE finished_at < ?', ((now - JOB_RETENTION).isoformat(),))
+    fail_stale_jobs(db, now)
+    db.execute(
+        'INSERT INTO upload_jobs (id, contest_year, total, processed, errors, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (job_id, year, len(entries) + len(errors), len(errors), json.dumps(errors), now.isoformat(), now.isoformat())
+    )
+    db.commit()
+
+    app = current_app._get_current_object()
+    threading.Thread(target=_run_job, args=(app, job_id, year, spool_dir, entries),
+                     name=f'upload-job-{job_id[:8]}', daemon=True).start()
+    return job_id
+
+
+def _run_job(app, job_id: str, year: int, spool_dir: str, entries: list) -> None:
+    with app.app_context():
+        try:
+            _process(job_id, year, entries)
+        except Exception as exc:
+            db = get_db()
+            db.rollback()
+            db.execute(
+                "UPDATE upload_jobs SET status = 'failed', errors = ?, finished_at = ? WHERE id = ?",
+                (json.dumps([f'Abgebrochen: {exc}']), datetime.now().isoformat(), job_id)
+            )
+            db.commit()
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def inspect_files(pool, entries: list, progress=None) -> tuple:
+    """
+    Hashing/Prüfung/Metadaten für [(pfad, dateiname)] parallel im Prozess-Pool.
+    Gibt (akzeptiert, meldungen) zurück; akzeptiert = [(pfad, dateiname, info)],
+    gleicher Inhalt mehrfach in entries zählt nur einmal (die erste Datei).
+    progress(fertig, meldungen) wird nach jeder Datei aufgerufen.
+    """
+    futures = {pool.submit(inspect_upload, path): index for index, (path, _filename) in enumerate(entries)}
+    results = [None] * len(entries)
+    errors = []
+    for done, future in enumerate(as_completed(futures), start=1):
+        index = futures[future]
+        try:
+            results[index] = future.result()
+        except Exception as exc:
+            errors.append(f'{entries[index][1]}: {exc}')
+        if progress is not None:
+            progress(done, errors)
+
+    accepted = []
+    seen = {}
+    for (path, filename), info in zip(entries, results):
+        if info is None:
+            continue
+        if info['sha256'] in seen:
+            errors.append(f'{filename}: Duplikat von {seen[info["sha256"]]}')
+            continue
+        seen[info['sha256']] = filename
+        accepted.append((path, filename, info))
+    return accepted, errors
+
+
+def present_in_year(db, year: int, digest: str) -> str | None:
+    """Dateiname eines Bildes im Jahr mit genau diesem Inhalt (oder None)."""
+    row = db.execute(
+        'SELECT filename FROM images WHERE blob_hash = ? AND contest_year = ? LIMIT 1',
+        (digest, year)
+    ).fetchone()
+    return row['filename'] if row else None
+
+
+def commit_images(db, year: int, accepted: list, before_commit=None) -> tuple:
+    """
+    Legt alle neuen Inhalte als Blob ab (Dateien werden verschoben) und
+    schreibt ihre images-Zeilen mit einem executemany in EINER Transaktion.
+    Schon im Jahr vorhandene Inhalte werden übersprungen.
+    before_commit(gespeichert, meldungen) läuft noch in der Transaktion.
+    Gibt (gespeicherte Zeilen [id, blob_hash, format], meldungen) zurück.
+    """
+    errors = []
+    uploaded_at = datetime.now().isoformat()
+    # Von diesem Commit neu angelegte Blob-Dateien: bei Rollback wieder löschen
+    created = []
+    begin_immediate(db)
+    try:
+        inserts = []
+        for path, filename, info in accepted:
+            digest = info['sha256']
+            existing = present_in_year(db, year, digest)
+            if existing is not None:
+                errors.append(f'{filename}: schon vorhanden als {existing}')
+                continue
+            # Im Write-Lock ablegen, damit ein paralleles Löschen den Blob nicht wegräumt;
+            # derselbe Inhalt aus einem anderen Jahr teilt sich den vorhandenen Blob
+            target = blob_path(digest, info['format'])
+            is_new = not os.path.exists(target)
+            store_blob(db, path, digest, info['format'])
+            if is_new:
+                created.append(target)
+            inserts.append((filename, uploaded_at, 1, year, digest[:HASH_LENGTH], digest, info['width'],
+                            info['height'], info['orientation'], info['placeholder']))
+
+        # Unter dem Write-Lock: alle ids > last_id stammen aus diesem Insert
+        last_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM images').fetchone()[0]
+        db.executemany(
+            '''
+            INSERT INTO images (filename, uploaded_at, visible, contest_year, content_hash, blob_hash,
+                                width, height, orientation, placeholder)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            inserts
+        )
+        saved = db.execute(
+            '''
+            SELECT images.id, images.blob_hash, blobs.format
+            FROM images
+            JOIN blobs ON blobs.hash = images.blob_hash
+            WHERE images.id > ?
+            ORDER BY images.id
+            ''',
+            (last_id,)
+        ).fetchall()
+        # Duel-Index + Snapshots der anderen Worker invalidieren
+        bump_config_version(db)
+        if before_commit is not None:
+            before_commit(saved, errors)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # blobs-Zeilen sind zurückgerollt, die verschobenen Dateien wären sonst verwaist
+        for target in created:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+        raise
+    return saved, errors
+
+
+def _process(job_id: str, year: int, entries: list) -> None:
+    db = get_db()
+    rejected = json.loads(db.execute('SELECT errors FROM upload_jobs WHERE id = ?', (job_id,)).fetchone()[0])
+    last_update = time.monotonic()
+
+    def progress(done: int, errors: list) -> None:
+        nonlocal last_update
+        if time.monotonic() - last_update >= PROGRESS_INTERVAL:
+            db.execute('UPDATE upload_jobs SET processed = ?, errors = ?, heartbeat_at = ? WHERE id = ?',
+                       (len(rejected) + done, json.dumps(rejected + errors), datetime.now().isoformat(), job_id))
+            db.commit()
+            last_update = time.monotonic()
+
+    accepted, errors = inspect_files(process_pool(), entries, progress)
+
+    def finish(saved: list, skipped: list) -> None:
+        db.execute(
+            "UPDATE upload_jobs SET status = 'done', processed = total, saved = ?, errors = ?, finished_at = ? WHERE id = ?",
+            (len(saved), json.dumps(rejected + errors + skipped), datetime.now().isoformat(), job_id)
+        )
+
+    saved, _skipped = commit_images(db, year, accepted, before_commit=finish)
+
+    # WebP/AVIF-Ableitungen erst nach dem Commit; Status ist schon 'done',
+    # die Ergebnisse landen gesammelt in einer Transaktion (ein Bump pro Job)
+    if saved:
+        futures, image_ids = schedule_derivatives(saved)
+        store_derivatives(db, futures, image_ids)
+
+
+def fail_stale_jobs(db, now: datetime | None = None) -> int:
+    """
+    Markiert 'running'-Jobs ohne Lebenszeichen seit JOB_STALE_AFTER als
+    fehlgeschlagen: stirbt der Worker mitten im Job, würde der Poller sonst
+    ewig warten. Commit macht der Aufrufer. Gibt die Zahl der Jobs zurück.
+    """
+    now = now or datetime.now()
+    stale = db.execute(
+        "SELECT id, errors FROM upload_jobs WHERE status = 'running' AND COALESCE(heartbeat_at, created_at) < ?",
+        ((now - JOB_STALE_AFTER).isoformat(),)
+    ).fetchall()
+    for row in stale:
+        errors = json.loads(row['errors'] or '[]') + ['Abgebrochen: Verarbeitung antwortet nicht mehr']
+        db.execute(
+            "UPDATE upload_jobs SET status = 'failed', errors = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+            (json.dumps(errors), now.isoformat(), row['id'])
+        )
+    return len(stale)
+
+
+def get_upload_job(job_id: str) -> dict | None:
+    db = get_db()
+    if fail_stale_jobs(db):
+        db.commit()
+    row = db.execute(
+        'SELECT id, contest_year, status, total, processed, saved, errors, created_at, finished_at '
+        'FROM upload_jobs WHERE id = ?',
+        (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['errors'] = json.loads(job['errors'] or '[]')
+    return job
+
+
+# ---- Bulk-Import (flask import-photos) ----
+
+def _copy_file(src, target: str) -> None:
+    with open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+
+def _collect_directory(source: str) -> list:
+    entries = []
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            filename = secure_filename(name)
+            if filename and allowed_file(filename):
+                entries.append((os.path.join(root, name), filename))
+    return entries
+
+
+def _extract_zip(source: str, spool_dir: str) -> list:
+    entries = []
+    with zipfile.ZipFile(source) as zf:
+        for index, entry in enumerate(zf.infolist()):
+            if entry.is_dir():
+                continue
+            filename = secure_filename(os.path.basename(entry.filename))
+            if not filename or not allowed_file(filename):
+                continue
+            target = os.path.join(spool_dir, f'{index:06d}.part')
+            with zf.open(entry) as src:
+                _copy_file(src, target)
+            entries.append((target, filename))
+    return entries
+
+
+def import_photos(year: int, source: str, workers: int | None = None, progress=None) -> dict:
+    """
+    Importiert alle erlaubten Bilder aus einem Ordner (rekursiv) oder Zip.
+    Zip-Member werden gestreamt in einen Spool-Ordner entpackt; Ordner-
+    Dateien bleiben liegen und werden erst nach der Prüfung (und nur wenn
+    neu) kopiert. Hashing/Prüfung laufen auf allen Kernen, alle images-Zeilen
+    entstehen in einer Transaktion (commit_images).
+    """
+    started = time.monotonic()
+    db = get_db()
+    spool_dir = os.path.join(current_app.instance_path, 'upload_spool', f'import-{uuid.uuid4().hex}')
+    os.makedirs(spool_dir)
+    try:
+        from_zip = os.path.isfile(source) and zipfile.is_zipfile(source)
+        entries = _extract_zip(source, spool_dir) if from_zip else _collect_directory(source)
+        total_bytes = sum(os.path.getsize(path) for path, _filename in entries)
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            accepted, errors = inspect_files(pool, entries, progress)
+
+        # Schon vorhandene Inhalte nicht erst kopieren (commit_images prüft im Lock noch einmal)
+        fresh = []
+        for path, filename, info in accepted:
+            existing = present_in_year(db, year, info['sha256'])
+            if existing is not None:
+                errors.append(f'{filename}: schon vorhanden als {existing}')
+                continue
+            if not from_zip:
+                staged = os.path.join(spool_dir, f'{len(fresh):06d}.part')
+                with open(path, 'rb') as src:
+                    _copy_file(src, staged)
+                path = staged
+            fresh.append((path, filename, info))
+
+        saved, skipped = commit_images(db, year, fresh)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return {
+        'files': len(entries),
+        'imported': len(saved),
+        'messages': errors + skipped,
+        'bytes': total_bytes,
+        'seconds': time.monotonic() - started,
+    }
+
+
+@click.command('import-photos')
+@click.option('--year', type=int, required=True, help='Wettbewerbsjahr.')
+@click.option('--workers', type=int, default=None, help='Prozesse für Hashing/Prüfung (Standard: alle Kerne).')
+@click.option('--verbose', is_flag=True, help='Alle übersprungenen/fehlerhaften Dateien ausgeben.')
+@click.argument('source', type=click.Path(exists=True))
+@with_appcontext
+def import_photos_command(year, workers, verbose, source):
+    def progress(done: int, _errors: list) -> None:
+        if done % 250 == 0:
+            click.echo(f'  {done} Dateien geprüft …')
+
+    result = import_photos(year, source, workers, progress)
+    if verbose:
+        for message in result['messages']:
+            click.echo(f'  {message}', err=True)
+
+    seconds = max(result['seconds'], 1e-6)
+    megabytes = result['bytes'] / (1024 * 1024)
+    click.echo(f'✔ {result["imported"]} von {result["files"]} Bildern für {year} importiert '
+               f'({len(result["messages"])} übersprungen/fehlerhaft).')
+    click.echo(f'  {megabytes:.1f} MB in {seconds:.1f} s · {result["files"] / seconds:.1f} Dateien/s · '
+               f'{megabytes / seconds:.1f} MB/s')
+    if result['imported']:
+        click.echo(f'  Ableitungen: flask build-derivatives --year {year}')
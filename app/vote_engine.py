@@ -0,0 +1,164 @@
+import sqlite3
+
+
+class VoteRejected(Exception):
+    """Vote verstößt gegen eine Regel (Limit, Unique-Option, All-in)."""
+
+    def __init__(self, message: str, status: int = 403):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class VoteEngine:
+    """
+    Wendet einen Klick auf /vote/<image_id> in genau einer Transaktion an.
+
+    Unter BEGIN IMMEDIATE werden nur zwei Single-Row-Lookups gemacht: der
+    Vote des Voters auf dieses Bild (UNIQUE-Index) und seine Zeile in
+    voter_year_stats (Anzahl + benutzte Option-Keys, per Trigger gepflegt).
+    Alle Regeln (unique_per_user, exclusive_group / all_in, max_actions)
+    werden danach im Speicher geprüft, Insert/Delete laufen mit einem
+    einzigen Commit. Da der Write-Lock schon vor dem Lesen gehalten wird,
+    können parallele Klicks (zweiter Tab, Doppelklick) die Regeln nicht
+    mehr zwischen Check und Insert umgehen.
+    """
+
+    def __init__(self, db: sqlite3.Connection, year_cfg: dict, opt_map: dict):
+        self.db = db
+        self.max_actions = int(year_cfg.get("max_actions", 4))
+        self.opt_map = opt_map
+
+    def load_state(self, image_id: int, voter_session_id: str, contest_year: int) -> tuple:
+        existing = self.db.execute(
+            'SELECT id, vote_option_key FROM votes WHERE image_id = ? AND voter_session_id = ? AND contest_year = ?',
+            (image_id, voter_session_id, contest_year)
+        ).fetchone()
+        stats = self.db.execute(
+            'SELECT vote_count, used_keys FROM voter_year_stats WHERE voter_session_id = ? AND contest_year = ?',
+            (voter_session_id, contest_year)
+        ).fetchone()
+        if stats is None:
+            return existing, 0, []
+        used_keys = [k for k in (stats['used_keys'] or '').split(',') if k]
+        return existing, stats['vote_count'], used_keys
+
+    def apply(self, image_id: int, voter_session_id: str, contest_year: int, vote_option_key: str) -> dict:
+        """
+        Läuft in der von run_write geöffneten Transaktion (Request-Verbindung
+        oder Gruppen-Commit der Write-Queue); Commit/Rollback macht der Aufrufer.
+        """
+        opt = self.opt_map.get(vote_option_key)
+        if not opt:
+            raise VoteRejected('Ungültige Vote-Option', 400)
+        existing, vote_count, used_keys = self.load_state(image_id, voter_session_id, contest_year)
+        return self._apply(existing, vote_count, used_keys, opt, image_id, voter_session_id,
+                           contest_year, vote_option_key)
+
+    def _apply(self, existing, vote_count: int, used_keys: list, opt: dict, image_id: int,
+               voter_session_id: str, contest_year: int, vote_option_key: str) -> dict:
+        db = self.db
+        vote_value = int(opt.get("value") or 1)
+        vote_label = str(opt.get("label") or vote_option_key)
+        unique_per_user = int(opt.get("unique_per_user") or 0)
+        exclusive_group = (opt.get("exclusive_group") or '').strip().lower()
+
+        # Toggle-Behaviour (gleiches Bild + gleiche Option => entfernen)
+        if existing:
+            db.execute('DELETE FROM votes WHERE id = ?', (existing['id'],))
+            # "Replace" auf demselben Bild: nur löschen, Client bekommt removed_only=True
+            removed_only = (existing['vote_option_key'] or '') != vote_option_key
+            return {'vote_count': vote_count - 1, 'removed_only': removed_only}
+
+        # Block: Option bereits woanders verwendet?
+        if unique_per_user and vote_option_key in used_keys:
+            raise VoteRejected(f'Option {vote_label} wurde bereits benutzt')
+
+        # Block: all_in Regeln
+        if vote_option_key == 'all_in' or exclusive_group == 'allin':
+            if vote_count > 0:
+                raise VoteRejected('All-in geht nur, wenn keine anderen Optionen gesetzt sind')
+        elif 'all_in' in used_keys:
+            raise VoteRejected('All-in ist bereits gesetzt. Erst All-in entfernen.')
+
+        # Limit pro User/Jahr (max_actions)
+        if vote_count >= self.max_actions:
+            raise VoteRejected(f'Du hast das Limit ({self.max_actions}) erreicht')
+
+        db.execute(
+            'INSERT INTO votes (image_id, voter_session_id, contest_year, vote_option_key, vote_value, vote_label) VALUES (?, ?, ?, ?, ?, ?)',
+            (image_id, voter_session_id, contest_year, vote_option_key, vote_value, vote_label)
+        )
+        return {'vote_count': vote_count + 1, 'removed_only': False}
+
+    def validate_ballot(self, placements: list) -> list:
+        """
+        Prüft einen kompletten Ballot in einem Durchlauf gegen dieselben Regeln
+        wie _apply (ein Vote pro Bild, unique_per_user, All-in allein,
+        max_actions). Gibt die Insert-Zeilen (image_id, key, value, label) zurück.
+        """
+        rows = []
+        seen_images = set()
+        seen_unique = set()
+        keys = []
+        for placement in placements:
+            if not isinstance(placement, dict):
+                raise VoteRejected('Ungültiger Eintrag im Ballot', 400)
+            # JSON: nur Ganzzahlen (kein bool, kein 1.5) oder Ziffern-Strings
+            image_id = placement.get('image_id')
+            if isinstance(image_id, str) and image_id.strip().isdigit():
+                image_id = int(image_id)
+            if isinstance(image_id, bool) or not isinstance(image_id, int):
+                raise VoteRejected('Ungültige image_id', 400)
+            vote_option_key = placement.get('vote_option_key')
+            if not isinstance(vote_option_key, str):
+                raise VoteRejected('Ungültige Vote-Option', 400)
+            vote_option_key = vote_option_key.strip()
+            opt = self.opt_map.get(vote_option_key)
+            if not opt:
+                raise VoteRejected(f'Ungültige Vote-Option {vote_option_key}', 400)
+            if image_id in seen_images:
+                raise VoteRejected('Pro Bild ist nur eine Option erlaubt', 400)
+            seen_images.add(image_id)
+
+            vote_label = str(opt.get("label") or vote_option_key)
+            if int(opt.get("unique_per_user") or 0):
+                if vote_option_key in seen_unique:
+                    raise VoteRejected(f'Option {vote_label} wurde bereits benutzt')
+                seen_unique.add(vote_option_key)
+
+            exclusive_group = (opt.get("exclusive_group") or '').strip().lower()
+            keys.append('all_in' if exclusive_group == 'allin' else vote_option_key)
+            rows.append((image_id, vote_option_key, int(opt.get("value") or 1), vote_label))
+
+        if 'all_in' in keys and len(keys) > 1:
+            raise VoteRejected('All-in geht nur, wenn keine anderen Optionen gesetzt sind')
+        if len(rows) > self.max_actions:
+            raise VoteRejected(f'Du hast das Limit ({self.max_actions}) erreicht')
+        return rows
+
+    def replace_ballot(self, voter_session_id: str, contest_year: int, placements: list) -> dict:
+        """
+        Ersetzt alle Votes des Voters im Jahr durch den geprüften Ballot.
+        Läuft wie apply in der von run_write geöffneten Transaktion.
+        """
+        rows = self.validate_ballot(placements)
+
+        db = self.db
+        if rows:
+            image_ids = [r[0] for r in rows]
+            found = db.execute(
+                f'SELECT id FROM images WHERE contest_year = ? AND visible = 1 AND id IN ({",".join("?" * len(image_ids))})',
+                (contest_year, *image_ids)
+            ).fetchall()
+            if len(found) != len(image_ids):
+                raise VoteRejected('Bild nicht gefunden oder nicht sichtbar', 404)
+        db.execute(
+            'DELETE FROM votes WHERE voter_session_id = ? AND contest_year = ?',
+            (voter_session_id, contest_year)
+        )
+        db.executemany(
+            'INSERT INTO votes (image_id, voter_session_id, contest_year, vote_option_key, vote_value, vote_label) VALUES (?, ?, ?, ?, ?, ?)',
+            [(image_id, voter_session_id, contest_year, key, value, label) for image_id, key, value, label in rows]
+        )
+        return {'vote_count': len(rows)}
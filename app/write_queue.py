@@ -0,0 +1,167 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+
+try:
+    from .db import ConnectionPool, get_db, begin_immediate
+except ImportError:
+    # Fallback for direct module execution
+    from db import ConnectionPool, get_db, begin_immediate
+
+
+class GroupCommitWriter:
+    """
+    Write-Behind für Klick-Writes (vote, react, duel_vote).
+
+    Requests legen eine Funktion fn(db) in die Queue und warten auf ihr
+    Future. Ein einzelner Writer-Thread sammelt bis zu max_batch Jobs (oder
+    max_delay Sekunden) und führt sie in EINER Transaktion aus, jeder Job in
+    einem eigenen SAVEPOINT: ein abgelehnter Vote rollt nur sich selbst
+    zurück. Die Futures werden erst nach dem Commit aufgelöst, ein Request
+    bekommt also nie ein Ergebnis, das noch nicht auf der Platte ist.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 256, max_delay: float = 0.002):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self.stats = {'jobs': 0, 'batches': 0, 'largest_batch': 0, 'failed_commits': 0}
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn) -> Future:
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def _run(self) -> None:
+        conn = self.pool.acquire()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit_batch(conn, batch)
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        # Abgebrochene Requests (Timeout) nicht mehr ausführen
+        batch = [(fn, future) for fn, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        outcomes = []
+        try:
+            begin_immediate(conn, pool=self.pool)
+            for fn, future in batch:
+                conn.execute('SAVEPOINT job')
+                try:
+                    value = fn(conn)
+                except Exception as exc:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    outcomes.append((future, exc, False))
+                else:
+                    conn.execute('RELEASE job')
+                    outcomes.append((future, value, True))
+            conn.commit()
+        except Exception as exc:
+            # Fehler außerhalb eines Jobs (BEGIN, SAVEPOINT, COMMIT): ganzer Batch
+            # ist verloren. Alle Futures scheitern lassen, Thread läuft weiter.
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            self.stats['failed_commits'] += 1
+            for _fn, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.stats['jobs'] += len(outcomes)
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(outcomes))
+        for future, value, ok in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, 'queued': self._queue.qsize()}
+
+
+_writer_lock = threading.Lock()
+
+
+def _writer() -> GroupCommitWriter:
+    """Ein Writer-Thread pro Prozess (nach fork neu)."""
+    app = current_app._get_current_object()
+    state = app.extensions.get('write_queue')
+    if state is None or state['pid'] != os.getpid():
+        # Erste Requests kommen parallel: nur einer baut Pool + Thread, die anderen nehmen ihn
+        with _writer_lock:
+            state = app.extensions.get('write_queue')
+            if state is None or state['pid'] != os.getpid():
+                cfg = app.config
+                pool = ConnectionPool(cfg['DATABASE'], 1, busy_timeout_ms=cfg['DB_BUSY_TIMEOUT_MS'],
+                                      mmap_size=cfg['DB_MMAP_SIZE'], cache_size=cfg['DB_CACHE_SIZE'])
+                state = {
+                    'pid': os.getpid(),
+                    'writer': GroupCommitWriter(pool, cfg['WRITE_QUEUE_MAX_BATCH'],
+                                                cfg['WRITE_QUEUE_MAX_DELAY_MS'] / 1000),
+                }
+                app.extensions['write_queue'] = state
+    return state['writer']
+
+
+def run_write(fn):
+    """
+    Führt fn(db) transaktional aus und gibt das Ergebnis zurück.
+    Standard: sofort auf der Request-Verbindung (eigener Commit).
+    WRITE_QUEUE_ENABLED: über den Gruppen-Commit-Writer.
+    Fehler aus fn (z.B. VoteRejected) kommen in beiden Modi unverändert an.
+    """
+    if not current_app.config['WRITE_QUEUE_ENABLED']:
+        db = get_db()
+        begin_immediate(db)
+        try:
+            result = fn(db)
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+        return result
+
+    future = _writer().submit(fn)
+    try:
+        return future.result(timeout=current_app.config['WRITE_QUEUE_TIMEOUT'])
+    except TimeoutError:
+        if future.cancel():
+            raise sqlite3.OperationalError('Write-Queue Timeout')
+    # Writer hat den Job schon: er wird committet (oder scheitert), also das
+    # echte Ergebnis abwarten statt Timeout melden und einen Retry doppelt buchen
+    return future.result()
+
+
+def write_queue_stats() -> dict | None:
+    state = current_app.extensions.get('write_queue')
+    if state is None or state['pid'] != os.getpid():
+        return None
+    return state['writer'].snapshot()
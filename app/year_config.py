@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime
+
+try:
+    from .db import get_read_db
+except ImportError:
+    # Fallback for direct module execution
+    from db import get_read_db
+
+from flask import g
+
+# Fallback, falls Settings für ein Jahr noch nicht existieren
+DEFAULT_YEAR_SETTINGS = {"vote_mode": "toggle", "max_actions": 3, "unit_name": "Stimme", "unit_icon": "❤️"}
+
+
+class YearConfig:
+    """Kompilierte Konfiguration eines Wettbewerbsjahres (Settings + aktive Vote-Optionen)."""
+
+    def __init__(self, year: int, settings: dict, options: list):
+        self.year = year
+        self.settings = settings
+        self.options = options
+        self.option_map = {o["opt_key"]: o for o in options}
+        self.exclusive_groups = {}
+        for o in options:
+            group = (o.get("exclusive_group") or '').strip().lower()
+            if group:
+                self.exclusive_groups.setdefault(group, []).append(o["opt_key"])
+        self.max_actions = int(settings.get("max_actions", 4))
+        self.vote_mode = (settings.get("vote_mode") or "toggle").strip()
+        self.published = bool(settings.get("published"))
+        self.publish_at = _parse_datetime(settings.get("publish_at"))
+
+    def is_published(self, now: datetime | None = None) -> bool:
+        """Manuell veröffentlicht oder geplanter Zeitpunkt (publish_at) erreicht."""
+        if self.published:
+            return True
+        return self.publish_at is not None and (now or datetime.now()) >= self.publish_at
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+# year -> (config_version, YearConfig); gilt pro Prozess
+_cache = {}
+_lock = threading.Lock()
+
+
+def config_version() -> int:
+    """Aktueller Stand aus config_version (einmal pro Request gelesen)."""
+    version = g.get('config_version')
+    if version is None:
+        row = get_read_db().execute('SELECT version FROM config_version WHERE id = 1').fetchone()
+        version = row[0] if row else 0
+        g.config_version = version
+    return version
+
+
+def _load(year: int) -> YearConfig:
+    db = get_read_db()
+    row = db.execute(
+        "SELECT * FROM contest_year_settings WHERE contest_year = ?",
+        (year,)
+    ).fetchone()
+    settings = dict(row) if row else dict(DEFAULT_YEAR_SETTINGS)
+    rows = db.execute("""
+        SELECT id, opt_key, label, icon, value, unique_per_user, exclusive_group, is_special, active, sort_order
+        FROM vote_options
+        WHERE contest_year = ? AND active = 1
+        ORDER BY sort_order ASC, id ASC
+    """, (year,)).fetchall()
+    return YearConfig(year, settings, [dict(r) for r in rows])
+
+
+def get_year_config(year: int) -> YearConfig:
+    version = config_version()
+    cached = _cache.get(year)
+    if cached and cached[0] == version:
+        return cached[1]
+    cfg = _load(year)
+    with _lock:
+        _cache[year] = (version, cfg)
+    return cfg
+
+
+def bump_config_version(db) -> None:
+    """Nach Änderungen an contest_year_settings/vote_options aufrufen (vor dem Commit)."""
+    db.execute('UPDATE config_version SET version = version + 1 WHERE id = 1')
+    with _lock:
+        _cache.clear()
+    g.pop('config_version', None)
@@ -1,11 +1,11 @@
 import os
 
 from app import create_app
-from app.db import init_db
+from app.db import cli_manages_schema, init_db
 
 app = create_app()
 
-if not os.path.exists(app.config['DATABASE']):
+if not os.path.exists(app.config['DATABASE']) and not cli_manages_schema():
     print("➕ Initialisiere Datenbank automatisch ...")
     with app.app_context():
         init_db()
@@ -30,6 +30,12 @@ else
   echo "✅ .env Datei existiert – wird nicht überschrieben."
 fi
 
+# 🗄️ DB-Migrationen einmal pro Deploy
+echo "🗄️ Führe DB-Migrationen aus..."
+python3 -m flask db-upgrade || exit 1
+# Schema ist aktuell -> die Worker migrieren beim Start nicht noch einmal (kein Lock zwischen Prozessen)
+export DB_AUTO_MIGRATE=0
+
 # 🧠 Starte Flask-App
 echo "🚀 Starte Flask-App..."
 python3 -m flask run --host=0.0.0.0 --port=5050
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App auf einer frischen Temp-DB (alle Migrationen, Seeds für 2025/2026)."""
+    # Auto-Migration aus: sonst würde create_app die DB unter instance/ migrieren
+    monkeypatch.setenv('DB_AUTO_MIGRATE', '0')
+    monkeypatch.setenv('WRITE_QUEUE_ENABLED', '0')
+    from app import create_app
+    from app.db import upgrade_db
+
+    app = create_app()
+    app.config.update(TESTING=True, DATABASE=str(tmp_path / 'votes.db'))
+    with app.app_context():
+        upgrade_db()
+    yield app
+    pools = app.extensions.get('db_pools')
+    if pools is not None:
+        pools['writer'].close_all()
+        pools['reader'].close_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_image(app):
+    """Legt ein Bild an und gibt seine id zurück."""
+    from app.db import get_db
+
+    def _add(year: int = 2026, visible: int = 1, filename: str | None = None) -> int:
+        with app.app_context():
+            db = get_db()
+            cur = db.execute(
+                'INSERT INTO images (filename, contest_year, uploaded_at, visible) VALUES (?, ?, ?, ?)',
+                (filename or f'img_{os.urandom(4).hex()}.jpg', year, '2026-01-01T00:00:00', visible)
+            )
+            db.commit()
+            return cur.lastrowid
+    return _add
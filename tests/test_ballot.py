@@ -0,0 +1,125 @@
+import pytest
+
+
+def post_ballot(client, placements, voter='voter-1', year=2026):
+    return client.post(f'/api/ballot/{year}', json={'voter_session_id': voter, 'placements': placements})
+
+
+def stored_votes(app, voter='voter-1', year=2026):
+    from app.db import get_db
+
+    with app.app_context():
+        rows = get_db().execute(
+            'SELECT image_id, vote_option_key FROM votes WHERE voter_session_id = ? AND contest_year = ? ORDER BY image_id',
+            (voter, year)
+        ).fetchall()
+        return [(r['image_id'], r['vote_option_key']) for r in rows]
+
+
+def test_accepts_valid_ballot(app, client, add_image):
+    a, b = add_image(), add_image()
+    resp = post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'},
+                                {'image_id': str(b), 'vote_option_key': ' chip_25 '}])
+    assert resp.status_code == 200
+    assert resp.get_json() == {'success': True, 'vote_count': 2}
+    assert stored_votes(app) == [(a, 'chip_5'), (b, 'chip_25')]
+
+
+def test_replaces_previous_ballot(app, client, add_image):
+    a, b = add_image(), add_image()
+    assert post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'}]).status_code == 200
+    assert post_ballot(client, [{'image_id': b, 'vote_option_key': 'chip_100'}]).status_code == 200
+    assert stored_votes(app) == [(b, 'chip_100')]
+
+
+def test_empty_ballot_clears_votes(app, client, add_image):
+    a = add_image()
+    post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'}])
+    resp = post_ballot(client, [])
+    assert resp.status_code == 200 and resp.get_json()['vote_count'] == 0
+    assert stored_votes(app) == []
+
+
+def test_all_in_alone_is_accepted(app, client, add_image):
+    a = add_image()
+    assert post_ballot(client, [{'image_id': a, 'vote_option_key': 'all_in'}]).status_code == 200
+
+
+@pytest.mark.parametrize('body', [
+    None,
+    [],
+    {'placements': []},
+    {'voter_session_id': 42, 'placements': []},
+    {'voter_session_id': 'voter-1'},
+    {'voter_session_id': 'voter-1', 'placements': {'image_id': 1}},
+])
+def test_rejects_malformed_request(client, body):
+    resp = client.post('/api/ballot/2026', json=body)
+    assert resp.status_code == 400
+    assert resp.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('placement', [
+    'chip_5',
+    {'image_id': None, 'vote_option_key': 'chip_5'},
+    {'image_id': True, 'vote_option_key': 'chip_5'},
+    {'image_id': 1.5, 'vote_option_key': 'chip_5'},
+    {'image_id': [1], 'vote_option_key': 'chip_5'},
+    {'image_id': 'abc', 'vote_option_key': 'chip_5'},
+    {'image_id': '{image}', 'vote_option_key': 5},
+    {'image_id': '{image}', 'vote_option_key': ['chip_5']},
+    {'image_id': '{image}', 'vote_option_key': None},
+    {'image_id': '{image}', 'vote_option_key': 'chip_7'},
+])
+def test_rejects_invalid_placement(app, client, add_image, placement):
+    image = add_image()
+    if isinstance(placement, dict) and placement['image_id'] == '{image}':
+        placement = {**placement, 'image_id': image}
+    resp = post_ballot(client, [placement])
+    assert resp.status_code == 400
+    assert stored_votes(app) == []
+
+
+def test_rejects_two_options_on_one_image(app, client, add_image):
+    a = add_image()
+    resp = post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'},
+                                {'image_id': a, 'vote_option_key': 'chip_25'}])
+    assert resp.status_code == 400
+
+
+def test_rejects_unique_option_twice(app, client, add_image):
+    a, b = add_image(), add_image()
+    resp = post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'},
+                                {'image_id': b, 'vote_option_key': 'chip_5'}])
+    assert resp.status_code == 403
+
+
+def test_rejects_all_in_with_other_options(app, client, add_image):
+    a, b = add_image(), add_image()
+    resp = post_ballot(client, [{'image_id': a, 'vote_option_key': 'all_in'},
+                                {'image_id': b, 'vote_option_key': 'chip_5'}])
+    assert resp.status_code == 403
+
+
+def test_rejects_more_than_max_actions(app, client, add_image):
+    # 2025: Herz-Vote ohne unique_per_user, max_actions = 3
+    images = [add_image(year=2025) for _ in range(4)]
+    resp = post_ballot(client, [{'image_id': i, 'vote_option_key': 'heart'} for i in images], year=2025)
+    assert resp.status_code == 403
+    assert stored_votes(app, year=2025) == []
+
+
+def test_rejects_hidden_or_foreign_image(app, client, add_image):
+    hidden, other_year = add_image(visible=0), add_image(year=2025)
+    for image in (hidden, other_year):
+        resp = post_ballot(client, [{'image_id': image, 'vote_option_key': 'chip_5'}])
+        assert resp.status_code == 404
+
+
+def test_rejected_ballot_keeps_previous_votes(app, client, add_image):
+    a, b = add_image(), add_image()
+    post_ballot(client, [{'image_id': a, 'vote_option_key': 'chip_5'}])
+    resp = post_ballot(client, [{'image_id': b, 'vote_option_key': 'chip_5'},
+                                {'image_id': a, 'vote_option_key': 'chip_5'}])
+    assert resp.status_code == 403
+    assert stored_votes(app) == [(a, 'chip_5')]
@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+import pytest
+
+
+@pytest.fixture
+def static_dir(app, tmp_path):
+    """Blob-Store im Temp-Ordner statt unter app/static."""
+    app.static_folder = str(tmp_path / 'static')
+    return app.static_folder
+
+
+def upload(app, tmp_path, year: int, data: bytes) -> tuple:
+    from app.db import get_db
+    from app.upload_jobs import commit_images
+
+    src = tmp_path / f'{os.urandom(4).hex()}.png'
+    src.write_bytes(data)
+    info = {'sha256': hashlib.sha256(data).hexdigest(), 'format': 'png', 'width': 1, 'height': 1,
+            'orientation': 1, 'placeholder': None}
+    with app.app_context():
+        saved, _errors = commit_images(get_db(), year, [(str(src), 'a.png', info)])
+    return saved[0]['id'], info['sha256']
+
+
+@pytest.fixture
+def admin(client):
+    with client.session_transaction() as sess:
+        sess['admin'] = True
+    return client
+
+
+def test_shared_blob_survives_until_last_image_is_deleted(app, admin, static_dir, tmp_path):
+    from app.blobs import blob_path
+
+    data = b'\x89PNG\r\n\x1a\n' + os.urandom(32)
+    first, digest = upload(app, tmp_path, 2025, data)
+    second, _ = upload(app, tmp_path, 2026, data)
+    with app.app_context():
+        path = blob_path(digest, 'png')
+    assert os.path.exists(path)
+
+    admin.post(f'/delete-image/{first}')
+    assert os.path.exists(path)
+    admin.post(f'/delete-image/{second}')
+    assert not os.path.exists(path)
+
+
+def test_files_stay_when_blob_is_stored_again(app, static_dir, tmp_path):
+    from app.blobs import blob_path, release_blob, remove_blob_files
+    from app.db import get_db
+
+    data = b'\x89PNG\r\n\x1a\n' + os.urandom(32)
+    image_id, digest = upload(app, tmp_path, 2026, data)
+    with app.app_context():
+        db = get_db()
+        db.execute('DELETE FROM images WHERE id = ?', (image_id,))
+        paths = release_blob(db, digest)
+        # Rollback: Zeilen bleiben, Dateien dürfen nicht weg sein
+        db.rollback()
+        assert paths and all(os.path.exists(p) for p in paths)
+        assert db.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone()
+        # blobs-Zeile noch da -> remove_blob_files lässt die Dateien liegen
+        remove_blob_files(db, digest, paths)
+        assert os.path.exists(blob_path(digest, 'png'))
@@ -0,0 +1,80 @@
+def spin(client, voter='voter-1'):
+    data = client.get(f'/api/duel-spin/2026?voter_session_id={voter}').get_json()
+    assert data['success']
+    return data
+
+
+def duel_vote(client, image_id, token, voter='voter-1'):
+    body = {'voter_session_id': voter, 'contest_year': 2026}
+    if token is not None:
+        body['spin_token'] = token
+    return client.post(f'/api/duel-vote/{image_id}', json=body)
+
+
+def test_duel_vote_records_pairings(app, client, add_image):
+    from app.db import get_db
+
+    for _ in range(3):
+        add_image()
+    data = spin(client)
+    winner = data['candidates'][0]['id']
+    resp = duel_vote(client, winner, data['spin_token'])
+    assert resp.status_code == 200 and resp.get_json()['used'] == 1
+    with app.app_context():
+        outcomes = get_db().execute('SELECT winner_id, loser_id FROM duel_outcomes').fetchall()
+    assert {r['winner_id'] for r in outcomes} == {winner} and len(outcomes) == 2
+
+
+def test_duel_vote_requires_spin_token(app, client, add_image):
+    from app.db import get_db
+
+    image = add_image()
+    for token in (None, '', 42):
+        assert duel_vote(client, image, token).status_code == 400
+    with app.app_context():
+        assert get_db().execute('SELECT COUNT(*) FROM duel_votes').fetchone()[0] == 0
+
+
+def test_spin_token_counts_once(client, add_image):
+    for _ in range(3):
+        add_image()
+    data = spin(client)
+    winner = data['candidates'][0]['id']
+    assert duel_vote(client, winner, data['spin_token']).status_code == 200
+    assert duel_vote(client, winner, data['spin_token']).status_code == 409
+
+
+def test_bradley_terry_fit_keeps_elo_column(app, client, add_image):
+    from app.db import get_db
+    from app.duel_ratings import duel_ranking, fit_bradley_terry
+
+    for _ in range(3):
+        add_image()
+    data = spin(client)
+    winner = data['candidates'][0]['id']
+    duel_vote(client, winner, data['spin_token'])
+    with app.app_context():
+        db = get_db()
+        elo_before = dict(db.execute('SELECT image_id, rating FROM duel_ratings').fetchall())
+        assert fit_bradley_terry(2026) == 3
+        rows = {r['id']: r for r in duel_ranking(db, 2026)}
+    assert {i: r['rating'] for i, r in rows.items()} == elo_before
+    assert all(r['bt_rating'] is not None for r in rows.values())
+    assert max(rows.values(), key=lambda r: r['bt_rating'])['id'] == winner
+
+
+def test_duel_ranking_hides_invisible_images(app, client, add_image):
+    from app.db import get_db
+    from app.duel_ratings import duel_ranking
+
+    for _ in range(3):
+        add_image()
+    data = spin(client)
+    winner = data['candidates'][0]['id']
+    duel_vote(client, winner, data['spin_token'])
+    with app.app_context():
+        db = get_db()
+        db.execute('UPDATE images SET visible = 0 WHERE id = ?', (winner,))
+        db.commit()
+        ranked = [r['id'] for r in duel_ranking(db, 2026)]
+    assert winner not in ranked and len(ranked) == 2
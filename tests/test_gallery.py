@@ -0,0 +1,30 @@
+def all_pages(client, year: int = 2026, limit: int = 2) -> list:
+    ids = []
+    cursor = ''
+    while True:
+        data = client.get(f'/api/images/{year}?limit={limit}&cursor={cursor}').get_json()
+        ids.extend(image['id'] for image in data['images'])
+        if not data['next_cursor']:
+            return ids
+        cursor = data['next_cursor']
+
+
+def test_pages_cover_every_visible_image_once(client, add_image):
+    images = [add_image() for _ in range(5)]
+    add_image(visible=0)
+    assert sorted(all_pages(client)) == sorted(images)
+
+
+def test_legacy_rows_without_uploaded_at_stay_in_scroll(app, client, add_image):
+    from app.db import backfill_uploaded_at, get_db
+
+    images = [add_image() for _ in range(5)]
+    with app.app_context():
+        db = get_db()
+        db.execute('UPDATE images SET uploaded_at = NULL WHERE id IN (?, ?, ?)', tuple(images[:3]))
+        db.commit()
+        backfill_uploaded_at()
+    pages = all_pages(client)
+    assert sorted(pages) == sorted(images)
+    # Altbestand ('') sortiert hinter alle datierten Bilder
+    assert set(pages[-3:]) == set(images[:3])
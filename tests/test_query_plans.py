@@ -0,0 +1,29 @@
+import sqlite3
+
+import pytest
+
+
+def test_hot_queries_use_indexes(app):
+    from app.query_plans import check_query_plans, collect_statements
+
+    with app.app_context():
+        assert collect_statements(app.root_path)
+        failures = check_query_plans(app.root_path)
+    assert failures == [], '\n'.join(f'{m}:{line} {scans}' for m, line, _sql, scans in failures)
+
+
+def test_all_indexes_exist_after_migrations(app):
+    from app.db import INDEXES, get_db
+
+    with app.app_context():
+        names = {r[0] for r in get_db().execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()}
+    assert set(INDEXES) <= names
+
+
+def test_ensure_indexes_reports_unknown_column(app, monkeypatch):
+    from app import db as db_module
+
+    monkeypatch.setitem(db_module.INDEXES, 'idx_votes_typo', 'votes (contest_year, no_such_column)')
+    with app.app_context():
+        with pytest.raises(sqlite3.OperationalError, match='no_such_column'):
+            db_module.ensure_indexes()
@@ -0,0 +1,14 @@
+def test_sticker_api_returns_urls(client):
+    # Vertrag seit dem Ordner-Index: fertige URLs statt Dateinamen
+    resp = client.get('/api/stickers/2026')
+    assert resp.status_code == 200
+    stickers = resp.get_json()
+    assert stickers and all(isinstance(url, str) and url.startswith('/') for url in stickers)
+    assert client.get(stickers[0]).status_code == 200
+
+
+def test_sticker_api_revalidates_with_etag(client):
+    first = client.get('/api/stickers')
+    assert first.headers.get('ETag')
+    again = client.get('/api/stickers', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
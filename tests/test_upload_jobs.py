@@ -0,0 +1,35 @@
+from datetime import datetime
+
+
+def insert_job(app, job_id: str, heartbeat_at: str) -> None:
+    from app.db import get_db
+
+    with app.app_context():
+        db = get_db()
+        db.execute(
+            'INSERT INTO upload_jobs (id, contest_year, total, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, 2026, 3, heartbeat_at, heartbeat_at)
+        )
+        db.commit()
+
+
+def test_job_endpoints_answer_json_401_without_login(client):
+    response = client.get('/admin/upload-jobs/abc')
+    assert response.status_code == 401
+    assert response.get_json() == {'success': False, 'error': 'Nicht angemeldet'}
+    assert client.post('/admin/upload-jobs/2026').status_code == 401
+
+
+def test_stale_running_job_is_marked_failed(app, client):
+    from app.upload_jobs import JOB_STALE_AFTER
+
+    insert_job(app, 'stale', (datetime.now() - JOB_STALE_AFTER * 2).isoformat())
+    insert_job(app, 'alive', datetime.now().isoformat())
+    with client.session_transaction() as sess:
+        sess['admin'] = True
+
+    stale = client.get('/admin/upload-jobs/stale').get_json()
+    assert stale['status'] == 'failed'
+    assert stale['finished_at']
+    assert len(stale['errors']) == 1
+    assert client.get('/admin/upload-jobs/alive').get_json()['status'] == 'running'
@@ -0,0 +1,149 @@
+import pytest
+
+
+@pytest.fixture
+def engine(app):
+    """VoteEngine für ein Jahr; cast(...) läuft wie /vote über run_write."""
+    from app.vote_engine import VoteEngine
+    from app.write_queue import run_write
+    from app.year_config import get_year_config
+
+    def _engine(year: int = 2026):
+        cfg = get_year_config(year)
+
+        def cast(image_id: int, option: str, voter: str = 'voter-1') -> dict:
+            return run_write(lambda db: VoteEngine(db, cfg.settings, cfg.option_map).apply(image_id, voter, year, option))
+        return cast
+
+    with app.test_request_context():
+        yield _engine
+
+
+def test_vote_toggles_on_same_option(engine, add_image):
+    cast = engine()
+    image = add_image()
+    assert cast(image, 'chip_5') == {'vote_count': 1, 'removed_only': False}
+    assert cast(image, 'chip_5') == {'vote_count': 0, 'removed_only': False}
+
+
+def test_other_option_on_same_image_only_removes(engine, add_image):
+    cast = engine()
+    image = add_image()
+    cast(image, 'chip_5')
+    assert cast(image, 'chip_25') == {'vote_count': 0, 'removed_only': True}
+
+
+def test_unique_option_only_once(engine, add_image):
+    from app.vote_engine import VoteRejected
+
+    cast = engine()
+    a, b = add_image(), add_image()
+    cast(a, 'chip_5')
+    with pytest.raises(VoteRejected) as exc:
+        cast(b, 'chip_5')
+    assert exc.value.status == 403
+    # andere Voter sind davon unabhängig
+    assert cast(b, 'chip_5', voter='voter-2')['vote_count'] == 1
+
+
+def test_all_in_excludes_other_options(engine, add_image):
+    from app.vote_engine import VoteRejected
+
+    cast = engine()
+    a, b = add_image(), add_image()
+    cast(a, 'all_in')
+    with pytest.raises(VoteRejected):
+        cast(b, 'chip_5')
+    cast(a, 'all_in')
+    cast(a, 'chip_5')
+    with pytest.raises(VoteRejected):
+        cast(b, 'all_in')
+
+
+def test_max_actions_limit(engine, add_image):
+    from app.vote_engine import VoteRejected
+
+    cast = engine(2025)
+    images = [add_image(year=2025) for _ in range(4)]
+    for image in images[:3]:
+        cast(image, 'heart')
+    with pytest.raises(VoteRejected, match='Limit'):
+        cast(images[3], 'heart')
+
+
+def test_unknown_option_is_bad_request(engine, add_image):
+    from app.vote_engine import VoteRejected
+
+    with pytest.raises(VoteRejected) as exc:
+        engine()(add_image(), 'chip_7')
+    assert exc.value.status == 400
+
+
+def test_rejected_vote_leaves_no_row(app, engine, add_image):
+    from app.db import get_db
+    from app.vote_engine import VoteRejected
+
+    cast = engine()
+    a, b = add_image(), add_image()
+    cast(a, 'all_in')
+    with pytest.raises(VoteRejected):
+        cast(b, 'chip_5')
+    count = get_db().execute('SELECT COUNT(*) FROM votes WHERE image_id = ?', (b,)).fetchone()[0]
+    assert count == 0
+
+
+def test_scores_and_voter_stats_follow_votes(app, engine, add_image):
+    from app.db import get_db
+
+    cast = engine()
+    a, b = add_image(), add_image()
+    cast(a, 'chip_25')
+    cast(b, 'chip_100')
+    cast(a, 'chip_25')
+    db = get_db()
+    scores = dict(db.execute('SELECT image_id, weighted_score FROM image_scores WHERE contest_year = 2026').fetchall())
+    assert scores == {a: 0, b: 100}
+    stats = db.execute(
+        "SELECT vote_count, used_keys FROM voter_year_stats WHERE voter_session_id = 'voter-1' AND contest_year = 2026"
+    ).fetchone()
+    assert stats['vote_count'] == 1 and stats['used_keys'].strip(',') == 'chip_100'
+
+
+def test_replace_ballot_is_atomic(app, add_image):
+    from app.db import get_db
+    from app.vote_engine import VoteEngine, VoteRejected
+    from app.write_queue import run_write
+    from app.year_config import get_year_config
+
+    a, b = add_image(), add_image()
+    with app.test_request_context():
+        cfg = get_year_config(2026)
+
+        def replace(placements: list) -> dict:
+            return run_write(lambda db: VoteEngine(db, cfg.settings, cfg.option_map).replace_ballot('voter-1', 2026, placements))
+
+        assert replace([{'image_id': a, 'vote_option_key': 'chip_50'}]) == {'vote_count': 1}
+        with pytest.raises(VoteRejected):
+            replace([{'image_id': b, 'vote_option_key': 'chip_5'},
+                     {'image_id': 999999, 'vote_option_key': 'chip_25'}])
+        rows = get_db().execute("SELECT image_id, vote_option_key FROM votes WHERE voter_session_id = 'voter-1'").fetchall()
+    assert [tuple(r) for r in rows] == [(a, 'chip_50')]
+
+
+def test_voter_stats_follow_vote_updates(app, engine, add_image):
+    from app.db import get_db
+
+    cast = engine()
+    a, b = add_image(), add_image()
+    cast(a, 'chip_25')
+    cast(b, 'chip_5', voter='voter-2')
+    db = get_db()
+    # Option tauschen und Vote einem anderen Voter zuordnen
+    db.execute("UPDATE votes SET vote_option_key = 'chip_50' WHERE voter_session_id = 'voter-1'")
+    db.execute("UPDATE votes SET voter_session_id = 'voter-1' WHERE voter_session_id = 'voter-2'")
+    db.commit()
+    stats = {
+        r['voter_session_id']: (r['vote_count'], sorted(k for k in r['used_keys'].split(',') if k))
+        for r in db.execute('SELECT voter_session_id, vote_count, used_keys FROM voter_year_stats WHERE contest_year = 2026')
+    }
+    assert stats == {'voter-1': (2, ['chip_5', 'chip_50']), 'voter-2': (0, [])}